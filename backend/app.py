@@ -1,17 +1,89 @@
-from fastapi import FastAPI, HTTPException
+import json
+import time
+from contextlib import asynccontextmanager, nullcontext
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 load_dotenv()
 
-from openai import OpenAI
-from backend.services.azure_search import vector_search_text, vector_search_images
-from backend.services.rag_pipeline import answer_question, embed_query, retrieve_context
+from backend.services import answer_cache, embedding_cache, metrics, reranker
+from backend.services.search_backend import SEARCH_BACKEND, RetrievalOptions
+from backend.services.clients import open_async_clients, close_async_clients
+from backend.services.embeddings import embed_query_async
+from backend.services.rag_pipeline import answer_question_async, stream_answer_async, retrieve_context_async
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # pooled, keep-alive clients live for the whole app, not per request
+    # the local backend searches in-process and needs no Search client
+    await open_async_clients(search=SEARCH_BACKEND == "azure")
+    yield
+    await close_async_clients()
+
+
+app = FastAPI(title="SOP RAG API", lifespan=lifespan)
+
+metrics.register_stats("answer", answer_cache.stats)
+metrics.register_stats("embedding", embedding_cache.stats)
+metrics.register_stats("reranker", reranker.stats)
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # the route template, not the raw path, keeps label values bounded
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        metrics.count_request(endpoint, status, time.perf_counter() - start)
+
+
+def debug_timings(debug: bool):
+    """
+    metrics.collect() when the request asked for timings and the server
+    allows it (DEBUG_TIMINGS_ENABLED), otherwise a no-op.
+    """
+    return metrics.collect() if debug and metrics.DEBUG_TIMINGS_ENABLED else nullcontext()
+
+
+def with_timings(result: dict, collected, started: float) -> dict:
+    if collected is None:
+        return result
+    collected["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 2)
+    return {**result, "timings": collected}
 
-app = FastAPI(title="SOP RAG API")
+
+def retrieval_options(top_k: int, image_k: int, overfetch: float = None,
+                      min_score: float = None, asset_types: str = None) -> RetrievalOptions:
+    """
+    Per-request retrieval options from query parameters; anything left
+    out keeps the server default. `asset_types` is comma-separated.
+    """
+    defaults = RetrievalOptions()
+    return RetrievalOptions(
+        text_k=top_k,
+        image_k=image_k,
+        overfetch=defaults.overfetch if overfetch is None else overfetch,
+        min_score=defaults.min_score if min_score is None else min_score,
+        asset_types=tuple(t.strip() for t in asset_types.split(",") if t.strip()) if asset_types else None
+    )
 
 @app.get("/")
-def health():
+async def health():
     return {"status": "ok", "message": "SOP RAG backend running"}
 
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # @app.get("/search")
 # def search(q: str):
 #     try:
@@ -22,26 +94,32 @@ def health():
 #         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/search")
-def search(q: str, top_k: int = 5):
+async def search(q: str, top_k: int = 5, image_k: int = 3, overfetch: float = None,
+                 min_score: float = None, asset_types: str = None, debug: bool = False):
     """
     Retrieval-only endpoint (TEXT + IMAGE)
     Useful for debugging RAG context
     """
+    started = time.perf_counter()
     try:
-        query_vector = embed_query(q)
+        options = retrieval_options(top_k, image_k, overfetch, min_score, asset_types)
+
+        with debug_timings(debug) as collected:
+            query_vector = await embed_query_async(q)
 
-        text_results = vector_search_text(query_vector, top_k)
-        image_results = vector_search_images(query_vector, top_k)
-        # text_results, image_results = retrieve_context(q)
+            text_results, image_results, complete = await retrieve_context_async(q, query_vector, options)
+            # text_results, image_results = retrieve_context(q)
 
-        return {
+        return with_timings({
             "query": q,
             "text_results": text_results,
-            "image_results": image_results
-        }
+            "image_results": image_results,
+            "complete": complete
+        }, collected, started)
 
     except Exception as e:
         print("❌ SEARCH ERROR:", repr(e))
+        metrics.count_error("/search", type(e).__name__)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -54,11 +132,52 @@ from fastapi import HTTPException
 import traceback
 
 @app.get("/ask")
-def ask(q: str, top_k: int = 5):
+async def ask(q: str, top_k: int = 5, image_k: int = 3, overfetch: float = None,
+              min_score: float = None, asset_types: str = None, debug: bool = False):
+    started = time.perf_counter()
     try:
-        return answer_question(q, top_k)
+        options = retrieval_options(top_k, image_k, overfetch, min_score, asset_types)
+        with debug_timings(debug) as collected:
+            result = await answer_question_async(q, options=options)
+        return with_timings(result, collected, started)
     except Exception as e:
         print("❌ INTERNAL ERROR:")
         traceback.print_exc()   # 🔥 THIS prints the traceback
+        metrics.count_error("/ask", type(e).__name__)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/ask/stream")
+async def ask_stream(q: str, top_k: int = 5, image_k: int = 3, overfetch: float = None,
+                     min_score: float = None, asset_types: str = None, debug: bool = False):
+    """
+    Server-sent events version of /ask: sources, then tokens, then done.
+    With debug timings on, the done event carries a timings block.
+    """
+    options = retrieval_options(top_k, image_k, overfetch, min_score, asset_types)
+
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            with debug_timings(debug) as collected:
+                async for event in stream_answer_async(q, options=options):
+                    data = event["data"]
+                    if event["event"] == "done":
+                        data = with_timings(data, collected, started)
+                    yield format_sse(event["event"], data)
+        except Exception as e:
+            print("❌ STREAM ERROR:")
+            traceback.print_exc()
+            metrics.count_error("/ask/stream", type(e).__name__)
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,168 @@
+# backend/ingest/caption_cache.py
+# On-disk cache of image captions, keyed by image content hash. Each
+# entry keeps the blob path the image was first uploaded to, so a
+# duplicate is neither captioned nor uploaded again. An opt-in
+# perceptual-hash fallback lets re-encoded copies reuse the caption
+# (never the blob: a look-alike may carry different labels).
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# ==============================
+# CONFIG
+# ==============================
+CAPTION_CACHE_ENABLED = os.getenv("CAPTION_CACHE_ENABLED", "true").lower() == "true"
+CAPTION_CACHE_PATH = os.getenv("CAPTION_CACHE_PATH", ".caption_cache.sqlite")
+
+# max differing bits between two dHashes to count as the same image;
+# 0 (default) means exact content matches only. Diagrams that look alike
+# but differ in SWL or weight labels would share a caption otherwise.
+IMAGE_PHASH_MAX_DISTANCE = int(os.getenv("IMAGE_PHASH_MAX_DISTANCE", "0"))
+
+
+_lock = threading.Lock()
+_conn = None
+_phashes = None          # np.uint64 array, parallel to _phash_hashes
+_phash_hashes = []
+_in_flight = {}          # content_hash -> Future of (caption, blob_path)
+_counters = {"hits": 0, "phash_hits": 0, "misses": 0}
+
+
+def _connect():
+    global _conn, _phashes, _phash_hashes
+
+    if _conn is None:
+        _conn = sqlite3.connect(CAPTION_CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS captions (
+                content_hash TEXT PRIMARY KEY,
+                phash TEXT,
+                caption TEXT NOT NULL,
+                blob_path TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        _conn.commit()
+
+        rows = _conn.execute("SELECT content_hash, phash FROM captions WHERE phash IS NOT NULL").fetchall()
+        _phash_hashes = [h for h, _ in rows]
+        _phashes = np.array([int(p, 16) for _, p in rows], dtype=np.uint64)
+
+    return _conn
+
+
+def _nearest_phash(phash):
+    if not IMAGE_PHASH_MAX_DISTANCE or phash is None or not len(_phashes):
+        return None
+
+    diff = np.bitwise_xor(_phashes, np.uint64(phash))
+    distances = np.unpackbits(diff.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+    best = int(np.argmin(distances))
+    if distances[best] <= IMAGE_PHASH_MAX_DISTANCE:
+        return _phash_hashes[best]
+    return None
+
+
+def lookup(content_hash: str, phash: int = None):
+    """
+    (caption, blob_path) of a cached image, or None. A perceptual-hash
+    match returns the caption with blob_path None: the other image's
+    blob is not this one.
+    """
+    if not CAPTION_CACHE_ENABLED:
+        return None
+
+    with _lock:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT caption, blob_path FROM captions WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+
+        if row:
+            _counters["hits"] += 1
+            return row
+
+        similar = _nearest_phash(phash)
+        if similar:
+            row = conn.execute(
+                "SELECT caption, blob_path FROM captions WHERE content_hash = ?", (similar,)
+            ).fetchone()
+            if row:
+                _counters["phash_hits"] += 1
+                return row[0], None
+
+        _counters["misses"] += 1
+        return None
+
+
+def store(content_hash: str, phash: int, caption: str, blob_path: str):
+    global _phashes
+
+    if not CAPTION_CACHE_ENABLED:
+        return
+
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO captions (content_hash, phash, caption, blob_path, created) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (content_hash, None if phash is None else f"{phash:016x}", caption, blob_path, time.time())
+        )
+        conn.commit()
+
+        if phash is not None:
+            _phash_hashes.append(content_hash)
+            _phashes = np.append(_phashes, np.uint64(phash))
+
+
+def get_or_create(content_hash: str, phash: int, create, upload):
+    """
+    Cached (caption, blob_path), or the result of `create()`, which is
+    then stored. A perceptual-hash hit reuses only the caption; the
+    image itself is uploaded with `upload()`, which returns its path.
+    Concurrent calls for the same image wait for the first one instead
+    of captioning it again.
+    """
+    cached = lookup(content_hash, phash)
+    if cached and cached[1]:
+        return tuple(cached)
+
+    with _lock:
+        future = _in_flight.get(content_hash)
+        owner = future is None
+        if owner:
+            future = _in_flight[content_hash] = Future()
+
+    if not owner:
+        return future.result()
+
+    try:
+        if cached:
+            caption, blob_path = cached[0], upload()
+        else:
+            caption, blob_path = create()
+        store(content_hash, phash, caption, blob_path)
+        future.set_result((caption, blob_path))
+        return caption, blob_path
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(content_hash, None)
+
+
+def stats() -> dict:
+    with _lock:
+        lookups = _counters["hits"] + _counters["phash_hits"] + _counters["misses"]
+        return {
+            **_counters,
+            "hit_rate": (_counters["hits"] + _counters["phash_hits"]) / lookups if lookups else 0.0
+        }
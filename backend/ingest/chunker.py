@@ -0,0 +1,199 @@
+# backend/ingest/chunker.py
+# Structure-aware chunking in tokens. Text is cut at heading, step and
+# sentence boundaries; a sliding window is only used for a single
+# sentence longer than the budget. One pass over the text, so chunking
+# stays linear in document size.
+import os
+import re
+
+from backend.services.embeddings import EMBEDDING_MODEL
+from backend.services.tokens import count_tokens
+
+
+# ==============================
+# CONFIG
+# ==============================
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "300"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+
+
+# "3.2 Lifting Operations", "4 Emergency Stop"
+NUMBERED_HEADING_PATTERN = re.compile(r"^(\d+(\.\d+)+\.?|\d+)\s+(?P<title>\S.*)$")
+# "SECTION 4 - EMERGENCY STOP"
+CAPS_HEADING_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9 &/,()\-–:]{2,}$")
+# all-caps lines that are instructions, not titles: "DO NOT ENTER WITHOUT A PERMIT"
+WARNING_PATTERN = re.compile(r"^(WARNING|CAUTION|DANGER|NOTE|NOTICE|IMPORTANT)\b|\b(DO NOT|NEVER|MUST|ALWAYS|NO)\b")
+# "1.", "2)", "a)", "Step 3", bullets
+STEP_PATTERN = re.compile(r"^(\d{1,3}[.)](?!\d)|[a-z][.)]|step\s+\d+\b|[•▪●◦\-\*–])\s*", re.IGNORECASE)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?;:])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+HEADING_MAX_WORDS = 12
+NUMBERED_HEADING_MAX_WORDS = 6
+
+# lowercase words allowed inside a Title Case heading
+MINOR_WORDS = {"a", "an", "and", "as", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"}
+
+
+def is_title_case(words) -> bool:
+    return words[0][0].isupper() and all(
+        not w[0].isalpha() or w[0].isupper() or w in MINOR_WORDS for w in words[1:]
+    )
+
+
+def is_warning(line: str) -> bool:
+    return bool(CAPS_HEADING_PATTERN.match(line) and WARNING_PATTERN.search(line))
+
+
+def is_heading(line: str, next_line: str = "") -> bool:
+    """
+    Numbered headings must be short and in Title Case, so a body line
+    that starts with a number ("2.5 tonnes is the maximum load") is not
+    one. An all-caps line is a heading unless it reads as a warning or
+    the next line carries on its sentence.
+    """
+    words = line.split()
+    if not words or len(words) > HEADING_MAX_WORDS or line.endswith((".", ",", ";")):
+        return False
+
+    numbered = NUMBERED_HEADING_PATTERN.match(line)
+    if numbered:
+        title = numbered.group("title").split()
+        return len(title) <= NUMBERED_HEADING_MAX_WORDS and is_title_case(title)
+
+    return (
+        bool(CAPS_HEADING_PATTERN.match(line))
+        and sum(c.isalpha() for c in line) >= 2
+        and not is_warning(line)
+        and not next_line[:1].islower()
+    )
+
+
+def split_blocks(text: str):
+    """
+    Yield (kind, text) blocks from page text: "heading", "warning",
+    "step" or "para". Wrapped lines of one paragraph or step are joined
+    back up.
+    """
+    kind, lines = None, []
+    raw_lines = text.splitlines()
+
+    for i, raw in enumerate(raw_lines):
+        line = raw.strip()
+        next_line = raw_lines[i + 1].strip() if i + 1 < len(raw_lines) else ""
+
+        if not line:
+            if lines:
+                yield kind, " ".join(lines)
+            kind, lines = None, []
+            continue
+
+        if is_heading(line, next_line):
+            if lines:
+                yield kind, " ".join(lines)
+            yield "heading", line
+            kind, lines = None, []
+        elif is_warning(line):
+            # kept as its own block, but no section break
+            if lines:
+                yield kind, " ".join(lines)
+            yield "warning", line
+            kind, lines = None, []
+        elif STEP_PATTERN.match(line):
+            if lines:
+                yield kind, " ".join(lines)
+            kind, lines = "step", [line]
+        else:
+            if not lines:
+                kind = "para"
+            lines.append(line)
+
+    if lines:
+        yield kind, " ".join(lines)
+
+
+def sliding_windows(text: str, max_tokens: int, overlap: int):
+    """
+    Word windows of at most `max_tokens`, each sharing about `overlap`
+    tokens with the previous one.
+    """
+    words = text.split()
+    sizes = [count_tokens(" " + w, EMBEDDING_MODEL) for w in words]
+
+    start = 0
+    while start < len(words):
+        end, total = start, 0
+        while end < len(words) and (total + sizes[end] <= max_tokens or end == start):
+            total += sizes[end]
+            end += 1
+
+        yield " ".join(words[start:end])
+        if end == len(words):
+            return
+
+        # step back far enough to repeat ~overlap tokens, but always advance
+        back, kept = end, 0
+        while back > start + 1 and kept + sizes[back - 1] <= overlap:
+            back -= 1
+            kept += sizes[back]
+        start = back
+
+
+def split_oversized(text: str, max_tokens: int, overlap: int):
+    """
+    Pieces of a block that is over budget: whole sentences where they
+    fit, sliding windows for a sentence that does not.
+    """
+    for sentence in SENTENCE_PATTERN.split(text):
+        if count_tokens(sentence, EMBEDDING_MODEL) <= max_tokens:
+            yield sentence
+        else:
+            yield from sliding_windows(sentence, max_tokens, overlap)
+
+
+def chunk_units(units, max_tokens: int = CHUNK_MAX_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS):
+    """
+    Pack units into chunks of at most `max_tokens`.
+
+    `units` is an iterable of (kind, text, meta). A heading always starts
+    a new chunk and stays with the text under it. Consecutive units are
+    merged until the next one would not fit. Yields (meta, text) where
+    meta is the first unit's, so citations point at where a chunk starts.
+    """
+    parts, meta, used = [], None, 0
+    has_body = False    # stacked headings stay together
+
+    def flush():
+        nonlocal parts, meta, used, has_body
+        chunk = "\n".join(parts)
+        parts, meta, used, has_body = [], None, 0, False
+        return chunk
+
+    for kind, text, unit_meta in units:
+        tokens = count_tokens(text, EMBEDDING_MODEL)
+
+        if kind == "heading" and has_body:
+            yield meta, flush()
+
+        if tokens > max_tokens:
+            for piece in split_oversized(text, max_tokens, overlap):
+                piece_tokens = count_tokens(piece, EMBEDDING_MODEL)
+                if parts and used + piece_tokens > max_tokens:
+                    yield meta, flush()
+                if not parts:
+                    meta = unit_meta
+                parts.append(piece)
+                used += piece_tokens
+                has_body = True
+            continue
+
+        if parts and used + tokens > max_tokens:
+            yield meta, flush()
+
+        if not parts:
+            meta = unit_meta
+        parts.append(text)
+        used += tokens
+        has_body = has_body or kind != "heading"
+
+    if parts:
+        yield meta, flush()
@@ -1,35 +1,183 @@
-
 # backend/ingest/image_captioner.py
 import base64
-from openai import OpenAI
+import math
+import os
+import random
+import threading
+import time
+from io import BytesIO
+
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from PIL import Image
+
+from backend.ingest.image_extractor import sniff_mime_type
+from backend.services.clients import get_openai_client
+
+
+# ==============================
+# CONFIG
+# ==============================
+CAPTION_MODEL = os.getenv("CAPTION_MODEL", "gpt-4o-mini")  # vision-capable
+
+# images are shrunk to this longest edge before they are sent
+CAPTION_MAX_EDGE = int(os.getenv("CAPTION_MAX_EDGE", "1024"))
+CAPTION_JPEG_QUALITY = int(os.getenv("CAPTION_JPEG_QUALITY", "85"))
+
+# OpenAI quota for the caption model; both buckets must have room
+CAPTION_REQUESTS_PER_MINUTE = float(os.getenv("CAPTION_REQUESTS_PER_MINUTE", "500"))
+CAPTION_TOKENS_PER_MINUTE = float(os.getenv("CAPTION_TOKENS_PER_MINUTE", "200000"))
+# output tokens budgeted per caption in the TPM estimate; the request
+# itself is not capped, so long captions of dense diagrams stay whole
+CAPTION_EXPECTED_TOKENS = int(os.getenv("CAPTION_EXPECTED_TOKENS", "400"))
+
+CAPTION_MAX_RETRIES = int(os.getenv("CAPTION_MAX_RETRIES", "5"))
+CAPTION_BACKOFF_SECONDS = float(os.getenv("CAPTION_BACKOFF_SECONDS", "1.0"))
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+# formats the vision endpoint accepts as-is
+MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "GIF": "image/gif", "WEBP": "image/webp"}
+
+PROMPT = "Describe this image for workplace safety documentation."
+
+
+# ==============================
+# RATE LIMIT
+# ==============================
+class TokenBucket:
+    """
+    Refills at `per_minute / 60` units per second up to one minute's
+    worth; acquire() blocks until enough units are available.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
 
-client = OpenAI()
+            time.sleep(wait)
 
+
+request_bucket = TokenBucket(CAPTION_REQUESTS_PER_MINUTE)
+token_bucket = TokenBucket(CAPTION_TOKENS_PER_MINUTE)
+
+
+# ==============================
+# IMAGE PREP
+# ==============================
+def prepare_image(image_bytes: bytes):
+    """
+    Returns (bytes, mime_type, width, height) ready to send. Images
+    larger than CAPTION_MAX_EDGE are downscaled; photos are re-encoded
+    as JPEG, everything else (line art, diagrams) as PNG.
+    """
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        image.load()
+    except Exception:
+        # Pillow cannot read it; send it as-is only if the type is known
+        mime = sniff_mime_type(image_bytes)
+        if mime is None:
+            raise ValueError("Unrecognised image format; cannot caption it")
+        return image_bytes, mime, None, None
+
+    source_format = image.format
+    width, height = image.size
+
+    if max(width, height) <= CAPTION_MAX_EDGE and source_format in MIME_TYPES:
+        return image_bytes, MIME_TYPES[source_format], width, height
+
+    image.thumbnail((CAPTION_MAX_EDGE, CAPTION_MAX_EDGE), Image.LANCZOS)
+    out = BytesIO()
+
+    if source_format == "JPEG" and image.mode in ("RGB", "L", "CMYK"):
+        image.convert("RGB" if image.mode == "CMYK" else image.mode).save(
+            out, "JPEG", quality=CAPTION_JPEG_QUALITY, optimize=True
+        )
+        mime = "image/jpeg"
+    else:
+        if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.save(out, "PNG", optimize=True)
+        mime = "image/png"
+
+    return out.getvalue(), mime, image.width, image.height
+
+
+def estimate_image_tokens(width, height) -> int:
+    # high-detail vision pricing: 85 base + 170 per 512px tile after the
+    # image is fitted into 2048 and its short side scaled to 768
+    if not width or not height:
+        return 1105
+
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+# ==============================
+# CAPTION
+# ==============================
 def caption_image(image_bytes: bytes) -> str:
-    # ✅ convert bytes → base64 string
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # vision-capable
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Describe this image for workplace safety documentation."
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}"
-                        }
+    data, mime, width, height = prepare_image(image_bytes)
+    base64_image = base64.b64encode(data).decode("utf-8")
+
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": PROMPT
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime};base64,{base64_image}"
                     }
-                ]
-            }
-        ],
-        temperature=0.0
-    )
+                }
+            ]
+        }
+    ]
+
+    # retries are ours (with jitter), not the SDK's
+    client = get_openai_client().with_options(max_retries=0)
+    tokens = estimate_image_tokens(width, height) + CAPTION_EXPECTED_TOKENS
 
-    return response.choices[0].message.content
+    for attempt in range(CAPTION_MAX_RETRIES + 1):
+        request_bucket.acquire()
+        token_bucket.acquire(tokens)
 
+        try:
+            response = client.chat.completions.create(
+                model=CAPTION_MODEL,
+                messages=messages,
+                temperature=0.0
+            )
+            return response.choices[0].message.content
+        except RETRYABLE_ERRORS as e:
+            if attempt == CAPTION_MAX_RETRIES:
+                raise
+            # full jitter: spread retries so workers do not stampede together
+            delay = random.uniform(0, CAPTION_BACKOFF_SECONDS * (2 ** attempt))
+            print(f"⚠️ Caption attempt {attempt + 1} failed ({type(e).__name__}); retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -1,32 +1,129 @@
 import fitz  # PyMuPDF
+import hashlib
 import os
 from io import BytesIO
 from PIL import Image
 
-def extract_images_from_pdf(blob_bytes, source_name):
-    doc = fitz.open(stream=blob_bytes, filetype="pdf")
+# logos, rules and icons below these limits are not worth a caption
+IMAGE_MIN_SIDE = int(os.getenv("IMAGE_MIN_SIDE", "48"))
+IMAGE_MIN_BYTES = int(os.getenv("IMAGE_MIN_BYTES", "1024"))
+IMAGE_MIN_ENTROPY = float(os.getenv("IMAGE_MIN_ENTROPY", "2.0"))
+# the entropy test only applies to images with both sides below this;
+# large line art and safety signs are low-entropy but still evidence
+IMAGE_ENTROPY_MAX_SIDE = int(os.getenv("IMAGE_ENTROPY_MAX_SIDE", "128"))
+
+
+# magic bytes of the formats the vision endpoint accepts
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_mime_type(image_bytes):
+    """
+    MIME type from the file signature, or None if it is not a format
+    the vision endpoint accepts.
+    """
+    for signature, mime in IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def dhash(image, size=8) -> int:
+    """
+    64-bit difference hash: survives re-encoding and small resizes,
+    so the same diagram exported twice hashes (almost) the same.
+    """
+    small = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def image_fingerprint(image_bytes):
+    """
+    (content_hash, phash, entropy) for one image; phash and entropy are
+    None when Pillow cannot decode it.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            image.draft("L", (256, 256))
+            gray = image.convert("L")
+            gray.thumbnail((256, 256))
+            return digest, dhash(gray), gray.entropy()
+    except Exception:
+        return digest, None, None
+
+
+def is_decorative(width, height, image_bytes, entropy) -> bool:
+    if min(width, height) < IMAGE_MIN_SIDE or len(image_bytes) < IMAGE_MIN_BYTES:
+        return True
+    if max(width, height) >= IMAGE_ENTROPY_MAX_SIDE:
+        return False
+    # small flat fills, bullets and simple icons carry almost no information
+    return entropy is not None and entropy < IMAGE_MIN_ENTROPY
+
+
+def extract_page_images(doc, page, source_name, image_index=0, seen_xrefs=None):
     extracted = []
-    image_index = 0
+    page_number = page.number + 1
 
-    for page_index in range(len(doc)):
-        page = doc[page_index]
-        images = page.get_images(full=True)
+    for img in page.get_images(full=True):
+        xref = img[0]
 
-        for img in images:
-            xref = img[0]
-            base = doc.extract_image(xref)
-            image_bytes = base["image"]
-            ext = base["ext"]
+        # the same image object repeated on every page (headers, logos)
+        if seen_xrefs is not None:
+            if xref in seen_xrefs:
+                continue
+            seen_xrefs.add(xref)
 
-            filename = f"{source_name}_p{page_index+1}_{image_index}.{ext}"
+        base = doc.extract_image(xref)
+        image_bytes = base["image"]
+        ext = base["ext"]
 
-            extracted.append({
-                "image_bytes": image_bytes,
-                "page_number": page_index + 1,
-                "file_name": filename
-            })
+        digest, phash, entropy = image_fingerprint(image_bytes)
+        if is_decorative(base["width"], base["height"], image_bytes, entropy):
+            continue
+        # neither Pillow nor the API could read it
+        if phash is None and sniff_mime_type(image_bytes) is None:
+            continue
 
-            image_index += 1
+        filename = f"{source_name}_p{page_number}_{image_index}.{ext}"
+
+        extracted.append({
+            "image_bytes": image_bytes,
+            "page_number": page_number,
+            "file_name": filename,
+            "content_hash": digest,
+            "phash": phash
+        })
+
+        image_index += 1
 
     return extracted
 
+
+def extract_images_from_pdf(blob_bytes, source_name):
+    doc = fitz.open(stream=blob_bytes, filetype="pdf")
+    extracted = []
+    seen_xrefs = set()
+
+    with doc:
+        for page in doc:
+            extracted.extend(extract_page_images(doc, page, source_name, len(extracted), seen_xrefs))
+
+    return extracted
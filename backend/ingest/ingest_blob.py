@@ -3,11 +3,28 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-from io import BytesIO
-
 import base64
-from backend.ingest.image_extractor import extract_images_from_pdf
+import multiprocessing
+import threading
+import queue
+import traceback
+from itertools import chain
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from backend.ingest import caption_cache
+from backend.ingest.chunker import chunk_units, split_blocks
 from backend.ingest.image_captioner import caption_image
+from backend.ingest.readers import parse_blob, is_supported
+from backend.ingest.manifest import (
+    load_manifest,
+    save_manifest,
+    content_hash,
+    etag_unchanged,
+    make_record,
+    stale_keys
+)
+from backend.services.answer_cache import bump_index_version
 from backend.services.blob_storage import upload_image
 
 
@@ -20,12 +37,9 @@ from backend.services.blob_storage import (
     list_blobs,
     download_blob
 )
-from backend.services.azure_search import upload_documents
-
-from openai import OpenAI
-from pypdf import PdfReader
-from docx import Document
-import pandas as pd
+from backend.services.azure_search import UPLOAD_MAX_IN_FLIGHT
+from backend.services.search_backend import upload_documents, delete_documents
+from backend.services.embeddings import embed_texts, EMBEDDING_BATCH_SIZE
 
 
 # ==============================
@@ -33,321 +47,422 @@ import pandas as pd
 # ==============================
 BLOB_CONNECTION_STRING = os.getenv("BLOB_CONNECTION_STRING")
 CONTAINER_NAME = "AZURE_STORAGE_CONTAINER"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-EMBEDDING_MODEL = "text-embedding-3-small"
-CHUNK_SIZE = 500
-OVERLAP = 50
+# "pipelined" overlaps parsing with network I/O, "sequential" is one blob at a time
+INGEST_MODE = os.getenv("INGEST_MODE", "pipelined")
+
+# Per-stage concurrency limits for the pipelined mode
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "8"))
+INGEST_DOWNLOAD_CONCURRENCY = int(os.getenv("INGEST_DOWNLOAD_CONCURRENCY", "4"))
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 2)))
+INGEST_CAPTION_CONCURRENCY = int(os.getenv("INGEST_CAPTION_CONCURRENCY", "4"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "2"))
+INGEST_PARSE_TIMEOUT = float(os.getenv("INGEST_PARSE_TIMEOUT", "300"))
+
+# Streaming upload: documents are sent in batches of this size, and at
+# most INGEST_QUEUE_SIZE embedded documents wait between workers and uploader
+INGEST_UPLOAD_BATCH_SIZE = int(os.getenv("INGEST_UPLOAD_BATCH_SIZE", "100"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "500"))
 
 
 # ==============================
 # CLIENTS
 # ==============================
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
 container_client = get_container_client()
 
 
 
 # ==============================
-# READERS
+# EMBEDDING
 # ==============================
-def read_pdf(blob_bytes):
-    reader = PdfReader(BytesIO(blob_bytes))
-    pages = []
-
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
-        if text:
-            pages.append({
-                "text": text,
-                "page_number": i + 1
-            })
-
-    return pages
-
-
-# def read_docx(blob_bytes):
-#     doc = Document(BytesIO(blob_bytes))
-#     pages = []
-
-#     for i, p in enumerate(doc.paragraphs):
-#         if p.text.strip():
-#             pages.append({
-#                 "text": p.text,
-#                 "page_number": f"Paragraph {i + 1}"
-#             })
-
-#     return pages
-
-def read_docx(blob_bytes):
-    #print("📘 DOCX reader activated")
-
-    doc = Document(BytesIO(blob_bytes))
-    results = []
-
-    current_section = "Introduction"
-    paragraph_counter = 0
-
-    for para in doc.paragraphs:
-        text = para.text.strip()
-        if not text:
-            continue
-
-        if para.style.name.startswith("Heading"):
-            #print("🧩 Heading detected:", text)
-            current_section = text
-            paragraph_counter = 0
-
-        paragraph_counter += 1
-
-        results.append({
-            "text": text,
-            "page_number": None,
-            "section": current_section,
-            "paragraph_number": paragraph_counter
-        })
-
-    #print("📘 DOCX paragraphs parsed:", len(results))
-    return results
-
-
-
-
-# def read_xlsx(blob_bytes):
-#     df = pd.read_excel(BytesIO(blob_bytes))
-#     return [{
-#         "text": df.to_string(index=False),
-#         "page_number": None
-#     }]
-
-def read_xlsx(blob_bytes):
-    xls = pd.ExcelFile(BytesIO(blob_bytes))
-    results = []
-
-    for sheet_name in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name=sheet_name).fillna("N/A")
+def embed_text(text: str):
+    return embed_texts([text])[0]
+
+
+def embed_documents(documents, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Fill in the vector field of every doc_entry using batched requests.
+    Text chunks embed `content`, images embed `image_caption`.
+    """
+    fields = []
+    for doc in documents:
+        if doc["asset_type"] == "image":
+            fields.append(("image_caption", "image_vector"))
+        else:
+            fields.append(("content", "content_vector"))
 
-        for idx, row in df.iterrows():
-           # Create a more robust row string
-            row_parts = []
-            for col in df.columns:
-                val = str(row[col]).strip()
-                # Even if it's N/A, we keep the column context for better search
-                row_parts.append(f"{col}: {val}")
+    texts = [doc[src] for doc, (src, _) in zip(documents, fields)]
+    vectors = embed_texts(texts, batch_size=batch_size)
 
-            row_text = f"Sheet: {sheet_name} | Row {idx + 1} | " + " | ".join(row_parts)
+    for doc, (_, dest), vector in zip(documents, fields, vectors):
+        doc[dest] = vector
 
-            results.append({
-                "text": row_text,
-                "page_number": None,
-                "sheet_name": sheet_name,
-                "row_number": idx + 1
-            })
+    return documents
 
-    return results
 
 
 # ==============================
-# CHUNKING
+# INGEST PIPELINE
 # ==============================
-def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=OVERLAP):
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start = end - overlap
+def caption_and_upload_image(blob_name, img):
+    blob_path = f"images/{blob_name}/page_{img['page_number']}/{img['file_name']}"
+
+    def upload():
+        upload_image(container_client, blob_path, img["image_bytes"])
+        return blob_path
+
+    def caption_and_upload():
+        caption = caption_image(img["image_bytes"])
+        return caption, upload()
+
+    # an image seen before (in any document) reuses its caption and blob
+    if img.get("content_hash"):
+        caption, image_path = caption_cache.get_or_create(
+            img["content_hash"], img.get("phash"), caption_and_upload, upload
+        )
+    else:
+        caption, image_path = caption_and_upload()
+
+    return {
+        "metadata_storage_path": make_safe_key(f"{blob_name}|img|{img['file_name']}"),
+        "asset_type": "image",
+        "image_blob_path": image_path,
+        "image_caption": caption,
+        "metadata_storage_name": blob_name,
+        "page_number": img["page_number"]
+    }
+
+
+def group_pages(pages):
+    """
+    Runs of consecutive pages that share a location. DOCX paragraphs
+    under one section form a single run, so they can share chunks;
+    PDF pages and XLSX rows stay on their own.
+    """
+    group, location = [], None
+
+    for page in pages:
+        page_location = tuple(page.get(k) for k in ("page_number", "section", "sheet_name", "row_number"))
+        if group and page_location != location:
+            yield group
+            group = []
+        group.append(page)
+        location = page_location
+
+    if group:
+        yield group
+
+
+def build_text_documents(blob_name, pages):
+    blob_documents = []
+
+    for group in group_pages(pages):
+        first = group[0]
+
+        # Identify Context (Heading or Sheet Name)
+        context = ""
+        if first.get("section"):
+            context = f"Section: {first['section']} | "
+        elif first.get("sheet_name"):
+            context = f"Sheet: {first['sheet_name']} | "
+
+        units = (
+            (kind, text, page)
+            for page in group
+            for kind, text in split_blocks(page["text"])
+        )
+
+        for page, chunk in chunk_units(units):
+            # Enrich the chunk text with its context so the vector is stronger
+            enriched_chunk = f"{context}{chunk}"
+
+            # the running index keeps keys unique across pages and sections
+            raw_key = f"{blob_name}|{page.get('section', page.get('sheet_name', ''))}|chunk={len(blob_documents)}"
+            safe_key = make_safe_key(raw_key)
+
+            doc_entry = {
+                "metadata_storage_path": safe_key,
+                "asset_type": "text",
+                "content": enriched_chunk, # Store enriched version
+                "metadata_storage_name": blob_name,
+                "page_number": page.get("page_number"),
+                "section": page.get("section"),
+                "paragraph_number": page.get("paragraph_number"),
+                "sheet_name": page.get("sheet_name"),
+                "row_number": page.get("row_number")
+            }
+            blob_documents.append(doc_entry)
+
+    return blob_documents
+
+
+def process_blob(blob, entry, parse=parse_blob, map_images=map,
+                 download_slot=nullcontext(), embed_slot=nullcontext(),
+                 batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Download, parse, caption and embed one blob, yielding ingest events:
+
+        ("doc", doc_entry)          one per index document, already embedded
+        ("done", blob_name, record) after the last document of the blob
+
+    Documents are embedded and released in batches, so a blob's vectors
+    are never all held at once. Nothing but the "done" event is yielded
+    when the content hash matches the manifest entry.
+    """
+    print(f"📄 Processing {blob.name}")
+
+    with download_slot:
+        blob_bytes = download_blob(container_client, blob.name)
 
-    return chunks
+    digest = content_hash(blob_bytes)
+    if entry and entry.get("content_hash") == digest:
+        print(f"⏭️ Content unchanged: {blob.name}")
+        yield ("done", blob.name, make_record(blob, digest, entry.get("keys", [])))
+        return
 
+    # 1. READ FILES
+    pages, images = parse(blob.name, blob_bytes)
+    del blob_bytes
 
-# ==============================
-# EMBEDDING
-# ==============================
-def embed_text(text: str) -> list:
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text
+    image_documents = map_images(
+        lambda img: caption_and_upload_image(blob.name, img), images
     )
-    return response.data[0].embedding
 
+    # 2. UNIFORM CHUNKING & ENRICHMENT
+    text_documents = build_text_documents(blob.name, pages)
+
+    # 3. BATCHED EMBEDDING (one request per batch, not per chunk)
+    keys = []
+    pending = []
+
+    for doc in chain(image_documents, text_documents):
+        pending.append(doc)
+        if len(pending) >= batch_size:
+            with embed_slot:
+                embed_documents(pending)
+            for ready in pending:
+                keys.append(ready["metadata_storage_path"])
+                yield ("doc", ready)
+            pending = []
+
+    if pending:
+        with embed_slot:
+            embed_documents(pending)
+        for ready in pending:
+            keys.append(ready["metadata_storage_path"])
+            yield ("doc", ready)
+
+    yield ("done", blob.name, make_record(blob, digest, keys))
+
+
+def ingest_documents(mode=INGEST_MODE, full_refresh=False):
+    """
+    Delta ingest: only new or changed blobs are processed, and index
+    documents that no longer exist in storage are deleted.
+
+    Documents are uploaded as they are produced. The manifest doubles as
+    the resume checkpoint: a blob is recorded only once all of its
+    documents are in the index, so re-running after a crash continues
+    with the blobs that had not finished.
+    """
+    manifest = load_manifest()
+    known = manifest["blobs"]
+    blobs = [b for b in list_blobs(container_client) if is_supported(b.name)]
+
+    # Blobs removed from storage
+    listed = {b.name for b in blobs}
+    removed = [name for name in known if name not in listed]
+    if removed:
+        delete_documents([k for name in removed for k in known.pop(name).get("keys", [])])
+        save_manifest(manifest)
+
+    pending = [
+        b for b in blobs
+        if full_refresh or not etag_unchanged(known.get(b.name), b)
+    ]
+    print(f"🔎 {len(pending)} new or changed blob(s), {len(blobs) - len(pending)} unchanged")
+
+    # a full refresh ignores the stored hashes so every blob is rebuilt
+    entries = {b.name: None if full_refresh else known.get(b.name) for b in pending}
+
+    if mode == "pipelined":
+        events = iter_ingest_events_pipelined(pending, entries)
+    else:
+        events = iter_ingest_events_sequential(pending, entries)
+
+    report = upload_stream(events, manifest)
+
+    if removed or report["uploaded"] or report["deleted"]:
+        # cached answers may cite documents that just changed
+        bump_index_version()
+
+    return report
+
+
+def upload_stream(events, manifest, batch_size=INGEST_UPLOAD_BATCH_SIZE):
+    """
+    Consume ingest events, uploading documents in batches of `batch_size`.
+    Up to UPLOAD_MAX_IN_FLIGHT batches are buffered and sent concurrently.
+
+    Finished blobs are committed to the manifest after the batch holding
+    their last document has been uploaded; their stale keys (chunks the
+    blob no longer produces) are deleted at the same point. A blob with
+    any document the index rejected is not committed, so the next run
+    retries it.
+    """
+    known = manifest["blobs"]
+    batch = []
+    finished = []
+    failed_blobs = set()
+    failed_keys = []
+    uploaded = 0
+    deleted = 0
+    flush_at = batch_size * UPLOAD_MAX_IN_FLIGHT
+
+    def flush():
+        nonlocal uploaded, deleted
+
+        if batch:
+            owners = {doc["metadata_storage_path"]: doc["metadata_storage_name"] for doc in batch}
+            report = upload_documents(batch, batch_size=batch_size)
+            uploaded += len(report["succeeded"])
+            failed_keys.extend(report["failed"])
+            failed_blobs.update(owners[f["key"]] for f in report["failed"])
+            batch.clear()
+
+        committed = [(name, record) for name, record in finished if name not in failed_blobs]
+        finished.clear()
+
+        if committed:
+            stale = []
+            for name, record in committed:
+                stale.extend(stale_keys(known.get(name), record["keys"]))
+                known[name] = record
+
+            delete_documents(stale)
+            deleted += len(stale)
+            save_manifest(manifest)
+
+    for event in events:
+        kind = event[0]
+
+        if kind == "doc":
+            batch.append(event[1])
+            if len(batch) >= flush_at:
+                flush()
+        elif kind == "done":
+            finished.append((event[1], event[2]))
+        elif kind == "failed":
+            failed_blobs.add(event[1])
+
+    flush()
+
+    print(f"✅ Uploaded {uploaded} documents to the search index")
+    if failed_keys:
+        print(f"❌ {len(failed_keys)} document(s) rejected by the index")
+    if failed_blobs:
+        print(f"⚠️ {len(failed_blobs)} blob(s) not committed: {sorted(failed_blobs)}")
+
+    return {"uploaded": uploaded, "deleted": deleted, "failed_keys": failed_keys, "failed_blobs": sorted(failed_blobs)}
+
+
+def iter_ingest_events_sequential(blobs, entries):
+    # one blob at a time, but its images are still captioned in parallel;
+    # a failing blob is reported and skipped, as in the pipelined mode
+    with ThreadPoolExecutor(max_workers=INGEST_CAPTION_CONCURRENCY) as caption_pool:
+        for blob in blobs:
+            try:
+                yield from process_blob(blob, entries.get(blob.name), map_images=caption_pool.map)
+            except Exception as e:
+                print(f"❌ Failed {blob.name}: {e!r}")
+                traceback.print_exc()
+                yield ("failed", blob.name, repr(e))
 
 
 # ==============================
-# INGEST PIPELINE
+# PIPELINED INGEST
 # ==============================
-# def ingest_documents():
-#     documents = []
-
-#     blobs = list_blobs(container_client)
-
-#     for blob in blobs:
-#         print(f"📄 Processing {blob.name}")
-#         blob_bytes = download_blob(container_client, blob.name)
-
-#         if blob.name.endswith(".pdf"):
-#             pages = read_pdf(blob_bytes)
-#             images = extract_images_from_pdf(blob_bytes, source_name=blob.name)
-#             # after extracting images
-#             for img in images:
-#                 caption = caption_image(img["image_bytes"])
-#                 vector = embed_text(caption)
-
-#                 blob_path = f"images/{blob.name}/page_{img['page_number']}/{img['file_name']}"
-#                 upload_image(container_client, blob_path, img["image_bytes"])
-
-#                 documents.append({
-#                     "metadata_storage_path": make_safe_key(f"{blob.name}|img|{img['file_name']}"),
-#                     "asset_type": "image",
-#                     "image_blob_path": blob_path,
-#                     "image_caption": caption,
-#                     "image_vector": vector,
-#                     "metadata_storage_name": blob.name,
-#                     "page_number": img["page_number"]})
-#         elif blob.name.endswith(".docx"):
-#             pages = read_docx(blob_bytes)
-#         elif blob.name.endswith(".xlsx"):
-#             pages = read_xlsx(blob_bytes)
-#         else:
-#             print(f"Skipped unsupported file: {blob.name}")
-#             continue
-        
-        
-
-#         for page in pages:
-#             # decide chunking strategy
-#             if blob.name.endswith(".pdf"):
-#                 chunks = chunk_text(page["text"])
-#             else:
-#                 # docx & xlsx: treat one unit as one chunk
-#                 chunks = [page["text"]]
-                
-
-#             for chunk_index, chunk in enumerate(chunks):
-#                 page_no = page.get("page_number")
-
-#                 # Stable key (DO NOT rely on page_number for docx/xlsx)
-#                 if page_no is None:
-#                     raw_key = f"{blob.name}|chunk={chunk_index}"
-#                 else:
-#                     raw_key = f"{blob.name}|page={page_no}|chunk={chunk_index}"
-#                 safe_key = make_safe_key(raw_key)
-
-#                 vector = embed_text(chunk)
-
-#                 document = {
-#                     "metadata_storage_path": safe_key,
-#                     "asset_type": "text",
-#                     "content": chunk,
-#                     "content_vector": vector,
-#                     "metadata_storage_name": blob.name,
-#                     "page_number": page_no
-#                 }
-
-#                 # DOCX metadata
-#                 if page.get("section"):
-#                     document["section"] = page["section"]
-#                 if page.get("paragraph_number"):
-#                     document["paragraph_number"] = page["paragraph_number"]
-
-#                 # XLSX metadata
-#                 if page.get("sheet_name"):
-#                     document["sheet_name"] = page["sheet_name"]
-#                 if page.get("row_number"):
-#                     document["row_number"] = page["row_number"]
-
-#                 documents.append(document)
-
-
-
-
-
-#     print(f"Uploading {len(documents)} chunks to Azure AI Search")
-#     upload_documents(documents)
-
-
-def ingest_documents():
-    documents = []
-    blobs = list_blobs(container_client)
-
-    for blob in blobs:
-        print(f"📄 Processing {blob.name}")
-        blob_bytes = download_blob(container_client, blob.name)
+def iter_ingest_events_pipelined(blobs, entries):
+    """
+    Overlap CPU parsing (process pool) with network I/O (thread pools).
+
+    Every stage has its own concurrency limit, and at most
+    INGEST_MAX_IN_FLIGHT blobs are worked on at once. Workers hand
+    documents over through a bounded queue, so they block instead of
+    buffering when the uploader falls behind. A blob that fails or times
+    out is reported as ("failed", blob_name, error) without blocking the
+    rest; it keeps its old manifest entry so the next run retries it.
+    """
+    events = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    stop = threading.Event()
+
+    download_slot = threading.BoundedSemaphore(INGEST_DOWNLOAD_CONCURRENCY)
+    embed_slot = threading.BoundedSemaphore(INGEST_EMBED_CONCURRENCY)
+
+    # spawn keeps forked children away from locks held by our network threads
+    parse_pool = ProcessPoolExecutor(
+        max_workers=INGEST_PARSE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    caption_pool = ThreadPoolExecutor(max_workers=INGEST_CAPTION_CONCURRENCY)
+    blob_pool = ThreadPoolExecutor(max_workers=INGEST_MAX_IN_FLIGHT)
+
+    def parse_in_pool(blob_name, blob_bytes):
+        future = parse_pool.submit(parse_blob, blob_name, blob_bytes)
+        return future.result(timeout=INGEST_PARSE_TIMEOUT)
+
+    def put(event):
+        while True:
+            if stop.is_set():
+                raise RuntimeError("ingest stopped")
+            try:
+                events.put(event, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def run(blob):
+        try:
+            for event in process_blob(
+                blob,
+                entries.get(blob.name),
+                parse=parse_in_pool,
+                map_images=caption_pool.map,
+                download_slot=download_slot,
+                embed_slot=embed_slot
+            ):
+                put(event)
+        except Exception as e:
+            if stop.is_set():
+                return
+            print(f"❌ Failed {blob.name}: {e!r}")
+            traceback.print_exc()
+            put(("failed", blob.name, repr(e)))
+
+    try:
+        for blob in blobs:
+            blob_pool.submit(run, blob)
+
+        remaining = len(blobs)
+        while remaining:
+            event = events.get()
+            if event[0] in ("done", "failed"):
+                remaining -= 1
+            yield event
+    finally:
+        # unblock workers first, otherwise shutdown would wait on a full queue
+        stop.set()
+        blob_pool.shutdown(wait=True, cancel_futures=True)
+        caption_pool.shutdown(wait=True)
+        # a hung parser must not keep the run alive
+        parse_pool.shutdown(wait=False, cancel_futures=True)
 
-        # 1. READ FILES
-        if blob.name.endswith(".pdf"):
-            pages = read_pdf(blob_bytes)
-            # Image extraction logic remains the same...
-            images = extract_images_from_pdf(blob_bytes, source_name=blob.name)
-            for img in images:
-                caption = caption_image(img["image_bytes"])
-                vector = embed_text(caption)
-                blob_path = f"images/{blob.name}/page_{img['page_number']}/{img['file_name']}"
-                upload_image(container_client, blob_path, img["image_bytes"])
-                documents.append({
-                    "metadata_storage_path": make_safe_key(f"{blob.name}|img|{img['file_name']}"),
-                    "asset_type": "image",
-                    "image_blob_path": blob_path,
-                    "image_caption": caption,
-                    "image_vector": vector,
-                    "metadata_storage_name": blob.name,
-                    "page_number": img["page_number"]
-                })
-        elif blob.name.endswith(".docx"):
-            pages = read_docx(blob_bytes)
-        elif blob.name.endswith(".xlsx"):
-            pages = read_xlsx(blob_bytes)
-        else:
-            continue
-
-        # 2. UNIFORM CHUNKING & ENRICHMENT
-        for page in pages:
-            base_text = page["text"]
-            
-            # Identify Context (Heading or Sheet Name)
-            context = ""
-            if page.get("section"):
-                context = f"Section: {page['section']} | "
-            elif page.get("sheet_name"):
-                context = f"Sheet: {page['sheet_name']} | "
-
-            # FORCE ALL to use the same chunking settings
-            # This levels the playing field for PDF vs Office
-            chunks = chunk_text(base_text, chunk_size=CHUNK_SIZE, overlap=OVERLAP)
-
-            for chunk_index, chunk in enumerate(chunks):
-                # Enrich the chunk text with its context so the vector is stronger
-                enriched_chunk = f"{context}{chunk}"
-                
-                page_no = page.get("page_number")
-                raw_key = f"{blob.name}|{page.get('section', page.get('sheet_name', ''))}|chunk={chunk_index}"
-                safe_key = make_safe_key(raw_key)
-
-                vector = embed_text(enriched_chunk)
-
-                doc_entry = {
-                    "metadata_storage_path": safe_key,
-                    "asset_type": "text",
-                    "content": enriched_chunk, # Store enriched version
-                    "content_vector": vector,
-                    "metadata_storage_name": blob.name,
-                    "page_number": page_no,
-                    "section": page.get("section"),
-                    "paragraph_number": page.get("paragraph_number"),
-                    "sheet_name": page.get("sheet_name"),
-                    "row_number": page.get("row_number")
-                }
-                documents.append(doc_entry)
-
-    print(f"Uploading {len(documents)} chunks to Azure AI Search")
-    upload_documents(documents)
 
 # ==============================
 # ENTRY POINT
 # ==============================
 if __name__ == "__main__":
-    ingest_documents()
+    import sys
+    ingest_documents(full_refresh="--full" in sys.argv)
 
 
@@ -0,0 +1,59 @@
+# backend/ingest/manifest.py
+# Local record of what each blob produced on the last ingest run, so
+# re-runs only touch new or changed blobs.
+import hashlib
+import json
+import os
+
+
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", ".ingest_manifest.json")
+
+
+def load_manifest(path=INGEST_MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return {"blobs": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path=INGEST_MANIFEST_PATH):
+    # write-then-rename so a crash never leaves a half-written manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def content_hash(blob_bytes: bytes) -> str:
+    return hashlib.sha256(blob_bytes).hexdigest()
+
+
+def etag_unchanged(entry, blob) -> bool:
+    """
+    Cheap check from the listing alone, before downloading anything.
+    """
+    return bool(entry) and entry.get("etag") == blob.etag
+
+
+def make_record(blob, digest: str, keys) -> dict:
+    last_modified = getattr(blob, "last_modified", None)
+
+    return {
+        "etag": blob.etag,
+        "last_modified": last_modified.isoformat() if last_modified else None,
+        "content_hash": digest,
+        # keys can repeat when chunks share a raw key; keep first-seen order
+        "keys": list(dict.fromkeys(keys))
+    }
+
+
+def stale_keys(old_entry, new_keys) -> list:
+    """
+    Keys a blob produced last time that it no longer produces.
+    """
+    if not old_entry:
+        return []
+
+    new_keys = set(new_keys)
+    return [k for k in old_entry.get("keys", []) if k not in new_keys]
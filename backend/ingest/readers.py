@@ -0,0 +1,190 @@
+# backend/ingest/readers.py
+# Pure file parsers. No clients are created at import time so these
+# functions can run inside a worker process.
+from io import BytesIO
+
+import fitz  # PyMuPDF
+from docx import Document
+import pandas as pd
+
+from backend.ingest.image_extractor import extract_page_images
+
+
+# ==============================
+# READERS
+# ==============================
+def iter_pdf(blob_bytes, source_name="", with_images=True):
+    """
+    Walk a PDF once, page by page, yielding
+    {"text", "page_number", "images"}. Text and images come from the
+    same PyMuPDF document, so the file is only parsed one time.
+    """
+    image_index = 0
+    seen_xrefs = set()
+
+    with fitz.open(stream=blob_bytes, filetype="pdf") as doc:
+        for page in doc:
+            images = []
+            if with_images:
+                images = extract_page_images(doc, page, source_name, image_index, seen_xrefs)
+                image_index += len(images)
+
+            yield {
+                "text": page.get_text("text"),
+                "page_number": page.number + 1,
+                "images": images
+            }
+
+
+def read_pdf(blob_bytes):
+    pages = []
+
+    for page in iter_pdf(blob_bytes, with_images=False):
+        if page["text"].strip():
+            pages.append({
+                "text": page["text"],
+                "page_number": page["page_number"]
+            })
+
+    return pages
+
+
+# def read_docx(blob_bytes):
+#     doc = Document(BytesIO(blob_bytes))
+#     pages = []
+
+#     for i, p in enumerate(doc.paragraphs):
+#         if p.text.strip():
+#             pages.append({
+#                 "text": p.text,
+#                 "page_number": f"Paragraph {i + 1}"
+#             })
+
+#     return pages
+
+def read_docx(blob_bytes):
+    #print("📘 DOCX reader activated")
+
+    doc = Document(BytesIO(blob_bytes))
+    results = []
+
+    current_section = "Introduction"
+    paragraph_counter = 0
+
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+
+        if para.style.name.startswith("Heading"):
+            #print("🧩 Heading detected:", text)
+            current_section = text
+            paragraph_counter = 0
+
+        paragraph_counter += 1
+
+        results.append({
+            "text": text,
+            "page_number": None,
+            "section": current_section,
+            "paragraph_number": paragraph_counter
+        })
+
+    #print("📘 DOCX paragraphs parsed:", len(results))
+    return results
+
+
+
+
+# def read_xlsx(blob_bytes):
+#     df = pd.read_excel(BytesIO(blob_bytes))
+#     return [{
+#         "text": df.to_string(index=False),
+#         "page_number": None
+#     }]
+
+def column_strings(values) -> list:
+    """
+    str(cell).strip() for one column of `df.values`, matching what
+    `row[col]` gave under iterrows: numpy scalars for numeric columns,
+    Timestamps/Timedeltas for datetime-like ones.
+    """
+    if values.dtype.kind in "mM":
+        values = pd.Series(values)
+    return [str(v).strip() for v in values]
+
+
+def sheet_rows(sheet_name, df) -> list:
+    """
+    One "Sheet: ... | Row n | col: val | ..." entry per row, built a
+    column at a time instead of one Series per row (iterrows).
+    """
+    # df.values is what iterrows walks, including its common-dtype
+    # upcast (an int column next to floats prints as "5.0")
+    values = df.values
+    row_numbers = [idx + 1 for idx in df.index.tolist()]
+
+    # Even if it's N/A, we keep the column context for better search
+    columns = [
+        [f"{col}: {val}" for val in column_strings(values[:, j])]
+        for j, col in enumerate(df.columns)
+    ]
+    rows = list(zip(*columns)) if columns else [()] * len(row_numbers)
+    prefix = f"Sheet: {sheet_name} | Row "
+
+    return [
+        {
+            "text": f"{prefix}{row_number} | " + " | ".join(parts),
+            "page_number": None,
+            "sheet_name": sheet_name,
+            "row_number": row_number
+        }
+        for row_number, parts in zip(row_numbers, rows)
+    ]
+
+
+def read_xlsx(blob_bytes):
+    xls = pd.ExcelFile(BytesIO(blob_bytes))
+    results = []
+
+    for sheet_name in xls.sheet_names:
+        df = pd.read_excel(xls, sheet_name=sheet_name).fillna("N/A")
+        results.extend(sheet_rows(sheet_name, df))
+
+    return results
+
+
+# ==============================
+# DISPATCH
+# ==============================
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".xlsx")
+
+
+def is_supported(blob_name: str) -> bool:
+    return blob_name.endswith(SUPPORTED_EXTENSIONS)
+
+
+def parse_blob(blob_name, blob_bytes):
+    """
+    CPU-bound stage of ingest: bytes -> (pages, images).
+    Returns (None, []) for unsupported file types.
+    """
+    images = []
+
+    if blob_name.endswith(".pdf"):
+        pages = []
+        for page in iter_pdf(blob_bytes, source_name=blob_name):
+            images.extend(page["images"])
+            if page["text"].strip():
+                pages.append({
+                    "text": page["text"],
+                    "page_number": page["page_number"]
+                })
+    elif blob_name.endswith(".docx"):
+        pages = read_docx(blob_bytes)
+    elif blob_name.endswith(".xlsx"):
+        pages = read_xlsx(blob_bytes)
+    else:
+        return None, []
+
+    return pages, images
@@ -0,0 +1,197 @@
+# ingest/reembed.py
+# Copy the current index into a new one with a different embedding size.
+# Vectors are shortened locally when the stored ones are long enough
+# (text-embedding-3 vectors can be truncated and re-normalised), and
+# re-embedded from the stored text otherwise. Other models only have
+# their native size. The source index is left
+# untouched, so the switch is just a config change once the copy is done:
+#
+#   python -m backend.ingest.reembed --dimensions 512 --target sop-index-512
+#   -> then set EMBEDDING_DIMENSIONS=512 and AZURE_SEARCH_INDEX_NAME (or
+#      LOCAL_INDEX_PATH) to the target and restart the API.
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+
+from azure.core.exceptions import HttpResponseError
+
+from backend.services import azure_search
+from backend.services.answer_cache import bump_index_version
+from backend.services.clients import get_search_client
+from backend.services.embeddings import (
+    EMBEDDING_MODEL,
+    embed_texts,
+    supports_dimensions,
+    truncate_embeddings,
+    vector_size
+)
+from backend.services.local_index import LocalVectorIndex, get_local_index
+from backend.services.search_backend import SEARCH_BACKEND
+
+
+# ==============================
+# CONFIG
+# ==============================
+REEMBED_BATCH_SIZE = 500
+
+# vector field -> the text it was embedded from
+SOURCE_TEXT = {"content_vector": "content", "image_vector": "image_caption"}
+
+KEY_FIELD = "metadata_storage_path"
+
+
+# ==============================
+# SOURCE
+# ==============================
+def iter_source_batches(backend=SEARCH_BACKEND, batch_size=REEMBED_BATCH_SIZE):
+    """
+    Batches of every document in the current index. Vector fields are
+    included when the backend returns them (local always, Azure only if
+    the fields are retrievable).
+    """
+    if backend == "local":
+        yield from get_local_index().iter_documents(batch_size)
+        return
+
+    client = get_search_client()
+    started = False
+    try:
+        for batch in iter_by_key(client, batch_size):
+            started = True
+            yield batch
+    except HttpResponseError:
+        if started:
+            raise
+        # indexes created outside create_index may not have a sortable key
+        print(f"⚠️ Cannot page by {KEY_FIELD}; falling back to a plain scan, "
+              "which stops at the service's skip limit on large indexes")
+        yield from iter_by_scan(client, batch_size)
+
+
+def _strip(r):
+    return {k: v for k, v in r.items() if not k.startswith("@search.")}
+
+
+def _odata_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def iter_by_key(client, batch_size):
+    """
+    Page through the index in key order, each page filtered to keys
+    after the last one seen. Unlike search("*") paging, this is not
+    cut off by the $skip limit.
+    """
+    last_key = None
+
+    while True:
+        batch = [_strip(r) for r in client.search(
+            search_text="*",
+            filter=f"{KEY_FIELD} gt {_odata_string(last_key)}" if last_key is not None else None,
+            order_by=[f"{KEY_FIELD} asc"],
+            top=batch_size
+        )]
+
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last_key = batch[-1][KEY_FIELD]
+
+
+def iter_by_scan(client, batch_size):
+    batch = []
+    for r in client.search(search_text="*"):
+        batch.append(_strip(r))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def vector_field(doc) -> str:
+    return "image_vector" if doc.get("asset_type") == "image" else "content_vector"
+
+
+def reembed_batch(batch, dimensions, force=False):
+    """
+    Give every doc a `dimensions`-long vector. Stored vectors at least
+    that long are truncated (text-embedding-3 models only); the rest are
+    embedded again.
+    """
+    can_truncate = supports_dimensions()
+    to_embed = []
+
+    for doc in batch:
+        field = vector_field(doc)
+        vector = doc.get(field)
+
+        for name in SOURCE_TEXT:
+            if name != field:
+                doc.pop(name, None)
+
+        if can_truncate and not force and vector is not None and len(vector) >= dimensions:
+            doc[field] = truncate_embeddings(vector, dimensions)
+        else:
+            to_embed.append(doc)
+
+    if to_embed:
+        texts = [doc.get(SOURCE_TEXT[vector_field(doc)]) or "" for doc in to_embed]
+        vectors = embed_texts(texts, dimensions=dimensions)
+        for doc, vector in zip(to_embed, vectors):
+            doc[vector_field(doc)] = vector
+
+    return batch, len(to_embed)
+
+
+# ==============================
+# MIGRATION
+# ==============================
+def reembed_index(dimensions, target, backend=SEARCH_BACKEND, force=False):
+    """
+    Copy every document into `target` (an Azure index name, or a
+    directory for the local backend) with `dimensions`-long vectors.
+    """
+    if not supports_dimensions() and dimensions != vector_size(0):
+        raise ValueError(f"{EMBEDDING_MODEL} only produces {vector_size(0)}-dimensional vectors")
+    if backend == "local":
+        index = LocalVectorIndex(target)
+        write = index.upsert
+    else:
+        azure_search.create_index(target, dimensions)
+        client = get_search_client(target)
+
+        def write(batch):
+            report = azure_search.upload_documents(batch, client=client)
+            if report["failed"]:
+                print(f"⚠️ {len(report['failed'])} documents failed to upload")
+
+    copied = embedded = 0
+    for batch in iter_source_batches(backend):
+        batch, n_embedded = reembed_batch(batch, dimensions, force)
+        write(batch)
+
+        copied += len(batch)
+        embedded += n_embedded
+        print(f"🔁 {copied} documents copied ({embedded} re-embedded)")
+
+    bump_index_version()
+    print(f"✅ {target} ready at {dimensions} dims; set EMBEDDING_DIMENSIONS={dimensions} and point the API at it")
+    return {"copied": copied, "embedded": embedded}
+
+
+# ==============================
+# ENTRY POINT
+# ==============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the index with a different embedding size")
+    parser.add_argument("--dimensions", type=int, required=True)
+    parser.add_argument("--target", required=True, help="new Azure index name or local index directory")
+    parser.add_argument("--backend", default=SEARCH_BACKEND, choices=["azure", "local"])
+    parser.add_argument("--reembed", action="store_true", help="always call the API, never truncate")
+    args = parser.parse_args()
+
+    reembed_index(args.dimensions, args.target, args.backend, force=args.reembed)
@@ -0,0 +1,152 @@
+# backend/services/answer_cache.py
+# In-process cache of final answers, in front of answer_question.
+# Exact hits by normalized question; near-duplicates by cosine
+# similarity of the query embedding.
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ==============================
+# CONFIG
+# ==============================
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# Touched by ingest whenever the index changes; cached answers older
+# than the index are dropped.
+INDEX_VERSION_PATH = os.getenv("INDEX_VERSION_PATH", ".index_version")
+
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # (scope, normalized question) -> entry
+_index_version = None
+_counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+
+
+def normalize_question(question: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(text.split())
+
+
+def bump_index_version():
+    """
+    Called by ingest after it changes the index.
+    """
+    with open(INDEX_VERSION_PATH, "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def _current_index_version():
+    try:
+        return os.stat(INDEX_VERSION_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _check_fresh():
+    # caller holds _lock
+    global _index_version
+
+    version = _current_index_version()
+    if version != _index_version:
+        _entries.clear()
+        _index_version = version
+
+    now = time.time()
+    expired = [k for k, e in _entries.items() if now - e["created"] > ANSWER_CACHE_TTL_SECONDS]
+    for k in expired:
+        del _entries[k]
+
+
+def _hit(key, kind):
+    _entries.move_to_end(key)
+    _counters[kind] += 1
+    return {**_entries[key]["result"], "cache_hit": True}
+
+
+def lookup_exact(question: str, scope: str = ""):
+    if not ANSWER_CACHE_ENABLED:
+        return None
+
+    key = (scope, normalize_question(question))
+
+    with _lock:
+        _check_fresh()
+        if key in _entries:
+            return _hit(key, "exact_hits")
+
+    return None
+
+
+def lookup_similar(query_vector, scope: str = ""):
+    """
+    Best cached answer whose query embedding is within the similarity
+    threshold, or None. Counts a miss when nothing matches.
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None
+
+    with _lock:
+        _check_fresh()
+
+        keys = [k for k in _entries if k[0] == scope]
+        if keys:
+            matrix = np.stack([_entries[k]["vector"] for k in keys])
+            query = _unit(query_vector)
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+
+            if scores[best] >= ANSWER_CACHE_SIMILARITY:
+                return _hit(keys[best], "similar_hits")
+
+        _counters["misses"] += 1
+
+    return None
+
+
+def store(question: str, query_vector, result: dict, scope: str = ""):
+    if not ANSWER_CACHE_ENABLED:
+        return
+
+    key = (scope, normalize_question(question))
+
+    with _lock:
+        _check_fresh()
+        _entries[key] = {
+            "vector": _unit(query_vector),
+            "result": result,
+            "created": time.time()
+        }
+        _entries.move_to_end(key)
+
+        while len(_entries) > ANSWER_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        hits = _counters["exact_hits"] + _counters["similar_hits"]
+        lookups = hits + _counters["misses"]
+        return {
+            **_counters,
+            "entries": len(_entries),
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+
+def _unit(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
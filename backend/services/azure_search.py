@@ -3,73 +3,400 @@ load_dotenv()
 
 
 
-from azure.search.documents import SearchClient
-from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
 
 from dotenv import load_dotenv
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import asyncio
+import contextvars
+import json
 import os
+import random
 import re
+import time
 
-endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
-key = os.getenv("AZURE_SEARCH_KEY")
-index_name = os.getenv("AZURE_SEARCH_INDEX_NAME")
-
-print("DEBUG endpoint:", endpoint)
-print("DEBUG key:", key)
-print("DEBUG index:", index_name)
-
-search_client = SearchClient(
-    endpoint=endpoint,
-    index_name=index_name,
-    credential=AzureKeyCredential(key)
+from azure.search.documents.indexes.models import (
+    HnswAlgorithmConfiguration,
+    SearchableField,
+    SearchField,
+    SearchFieldDataType,
+    SearchIndex,
+    SimpleField,
+    VectorSearch,
+    VectorSearchProfile,
 )
 
+from backend.services import metrics
+from backend.services.clients import get_search_client, get_async_search_client, get_search_index_client
+from backend.services.embeddings import vector_size
+
 def extract_page(path: str):
     match = re.search(r"page=(\d+)", path)
     return int(match.group(1)) if match else None
 
-def upload_documents(documents, batch_size=100):
-    total = len(documents)
-    print(f"🔼 Uploading {total} documents in batches of {batch_size}")
+# ==============================
+# UPLOAD
+# ==============================
+# Service limits are 1000 documents and 16 MB per indexing request;
+# the byte budget leaves headroom for request overhead.
+UPLOAD_MAX_IN_FLIGHT = int(os.getenv("SEARCH_UPLOAD_MAX_IN_FLIGHT", "4"))
+UPLOAD_MAX_BATCH_BYTES = int(os.getenv("SEARCH_UPLOAD_MAX_BATCH_BYTES", str(12 * 1024 * 1024)))
+UPLOAD_MAX_RETRIES = int(os.getenv("SEARCH_UPLOAD_MAX_RETRIES", "5"))
+UPLOAD_BACKOFF_SECONDS = float(os.getenv("SEARCH_UPLOAD_BACKOFF_SECONDS", "1.0"))
+
+RETRYABLE_STATUS_CODES = {429, 503}
+
+
+def as_list(vector):
+    # the REST API takes JSON arrays; vectors are NumPy arrays elsewhere
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+def to_wire(doc: dict) -> dict:
+    return {k: as_list(v) if hasattr(v, "tolist") else v for k, v in doc.items()}
+
+
+def iter_upload_batches(documents, batch_size=100, max_bytes=UPLOAD_MAX_BATCH_BYTES):
+    """
+    Group documents into batches bounded by count and serialized size.
+    """
+    batch = []
+    batch_bytes = 0
+
+    for doc in documents:
+        doc_bytes = len(json.dumps(doc, default=str))
+
+        if batch and (len(batch) >= min(batch_size, 1000) or batch_bytes + doc_bytes > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        batch.append(doc)
+        batch_bytes += doc_bytes
+
+    if batch:
+        yield batch
+
+
+def _upload_batch(batch, client=None):
+    """
+    Upload one batch, retrying only the keys that failed with a
+    throttling status or a transport error. Returns (succeeded_keys,
+    failed_entries).
+    """
+    client = client or get_search_client()
+    succeeded = []
+    failed = []
+    pending = batch
+    last_error = {}     # key -> (status_code, error) of its latest retryable failure
+
+    for attempt in range(UPLOAD_MAX_RETRIES + 1):
+        retry = []
+
+        try:
+            results = client.upload_documents(pending)
+        except (ServiceRequestError, ServiceResponseError) as e:
+            # connection reset, DNS, timeout: no status code, worth another try
+            retry = pending
+            last_error.update((doc["metadata_storage_path"], (None, repr(e))) for doc in pending)
+        except HttpResponseError as e:
+            if e.status_code == 413 and len(pending) > 1:
+                # payload too large: split and send both halves
+                half = len(pending) // 2
+                for part in (pending[:half], pending[half:]):
+                    ok, bad = _upload_batch(part, client)
+                    succeeded.extend(ok)
+                    failed.extend(bad)
+                return succeeded, failed
+
+            if e.status_code in RETRYABLE_STATUS_CODES:
+                retry = pending
+                last_error.update((doc["metadata_storage_path"], (e.status_code, str(e))) for doc in pending)
+            else:
+                failed.extend({
+                    "key": doc["metadata_storage_path"],
+                    "status_code": e.status_code,
+                    "error": str(e)
+                } for doc in pending)
+                return succeeded, failed
+        else:
+            by_key = {doc["metadata_storage_path"]: doc for doc in pending}
+
+            for r in results:
+                if r.succeeded:
+                    succeeded.append(r.key)
+                elif r.status_code in RETRYABLE_STATUS_CODES:
+                    retry.append(by_key[r.key])
+                    last_error[r.key] = (r.status_code, r.error_message)
+                else:
+                    failed.append({
+                        "key": r.key,
+                        "status_code": r.status_code,
+                        "error": r.error_message
+                    })
+
+        if not retry:
+            return succeeded, failed
+
+        pending = retry
+        if attempt < UPLOAD_MAX_RETRIES:
+            # exponential backoff with jitter
+            time.sleep(UPLOAD_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+
+    for doc in pending:
+        status_code, error = last_error[doc["metadata_storage_path"]]
+        failed.append({
+            "key": doc["metadata_storage_path"],
+            "status_code": status_code,
+            "error": f"retries exhausted: {error}"
+        })
+    return succeeded, failed
+
+
+def upload_documents(documents, batch_size=100, max_in_flight=UPLOAD_MAX_IN_FLIGHT, client=None):
+    """
+    Upload documents with up to `max_in_flight` batches running at once.
+
+    `documents` may be any iterable; batches are built lazily, so a
+    generator is never materialised in full. Returns a report:
+
+        {"succeeded": [key, ...],
+         "failed": [{"key", "status_code", "error"}, ...]}
+    """
+    report = {"succeeded": [], "failed": []}
+    in_flight = set()
+    documents = (to_wire(doc) for doc in documents)
+
+    def collect(done):
+        for future in done:
+            ok, bad = future.result()
+            report["succeeded"].extend(ok)
+            report["failed"].extend(bad)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for batch in iter_upload_batches(documents, batch_size):
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(pool.submit(_upload_batch, batch, client))
+
+        done, _ = wait(in_flight)
+        collect(done)
+
+    return report
+
+def delete_documents(keys, batch_size=1000):
+    keys = list(keys)
+    if not keys:
+        return
+
+    print(f"🗑️ Deleting {len(keys)} stale documents")
+
+    for i in range(0, len(keys), batch_size):
+        batch = [{"metadata_storage_path": k} for k in keys[i:i + batch_size]]
+        get_search_client().delete_documents(batch)
+
+
+# ==============================
+# INDEX SCHEMA
+# ==============================
+VECTOR_PROFILE = "vector-profile"
+
+
+def build_index(index_name: str, dimensions: int = None) -> SearchIndex:
+    """
+    Index definition matching the documents ingest uploads. Both vector
+    fields are declared with `dimensions` (default: vector_size(), so it
+    follows EMBEDDING_DIMENSIONS).
+    """
+    dimensions = dimensions or vector_size()
+
+    def vector_field(name):
+        return SearchField(
+            name=name,
+            type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
+            searchable=True,
+            vector_search_dimensions=dimensions,
+            vector_search_profile_name=VECTOR_PROFILE
+        )
+
+    fields = [
+        # filterable + sortable so the whole index can be paged by key
+        SimpleField(name="metadata_storage_path", type=SearchFieldDataType.String, key=True,
+                    filterable=True, sortable=True),
+        SimpleField(name="metadata_storage_name", type=SearchFieldDataType.String, filterable=True),
+        SimpleField(name="asset_type", type=SearchFieldDataType.String, filterable=True),
+        SearchableField(name="content"),
+        SearchableField(name="image_caption"),
+        SimpleField(name="image_blob_path", type=SearchFieldDataType.String),
+        SimpleField(name="page_number", type=SearchFieldDataType.Int32),
+        SimpleField(name="section", type=SearchFieldDataType.String),
+        SimpleField(name="paragraph_number", type=SearchFieldDataType.Int32),
+        SimpleField(name="sheet_name", type=SearchFieldDataType.String),
+        SimpleField(name="row_number", type=SearchFieldDataType.Int32),
+        vector_field("content_vector"),
+        vector_field("image_vector"),
+    ]
+
+    return SearchIndex(
+        name=index_name,
+        fields=fields,
+        vector_search=VectorSearch(
+            algorithms=[HnswAlgorithmConfiguration(name="hnsw")],
+            profiles=[VectorSearchProfile(name=VECTOR_PROFILE, algorithm_configuration_name="hnsw")]
+        )
+    )
+
+
+def create_index(index_name: str, dimensions: int = None):
+    # vector dimensions cannot be changed on an existing field, so a new
+    # size always goes into a new index
+    return get_search_index_client().create_or_update_index(build_index(index_name, dimensions))
+
+# ==============================
+# SEARCH
+# ==============================
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "10"))
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "16"))
+
+# Shared by every request; the SearchClient's HTTP session (and its
+# connection pool) is reused across these threads.
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="search")
+
+
+def run_searches(searches: dict, timeout: float = SEARCH_TIMEOUT_SECONDS) -> dict:
+    """
+    Run independent searches at the same time.
+
+    `searches` maps a name to a zero-argument callable. Latency is the
+    slowest call rather than the sum. A search still running after
+    `timeout` seconds contributes None; other errors propagate.
+    """
+    # copied context: the workers' timings land in the calling request's
+    futures = {
+        name: _search_pool.submit(contextvars.copy_context().run, fn)
+        for name, fn in searches.items()
+    }
+    deadline = time.monotonic() + timeout
+    results = {}
 
-    for i in range(0, total, batch_size):
-        batch = documents[i:i + batch_size]
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            print(f"⚠️ {name} search timed out after {timeout}s")
+            future.cancel()
+            results[name] = None
 
-        result = search_client.upload_documents(batch)
+    return results
 
-        failed = [r for r in result if not r.succeeded]
-        if failed:
-            print("❌ Failed documents:")
-            for f in failed:
-                print(f)
-            raise Exception("Azure Search batch upload failed")
 
-        print(f"✅ Uploaded batch {i // batch_size + 1}")
+def search_outcome(results: dict):
+    """
+    (text_hits, image_hits, complete) from run_searches' results;
+    `complete` is False when a search timed out and its hits are missing.
+    """
+    complete = all(hits is not None for hits in results.values())
+    return results.get("text") or [], results.get("image") or [], complete
 
-def vector_search_text(query_vector: list, top_k: int = 5):
-    results = search_client.search(
-        search_text=None,
+
+def split_asset_types(asset_types=None):
+    """
+    Text-side and image-side asset types allowed by `asset_types`
+    (None allows everything). An empty side means that search is skipped.
+    """
+    if asset_types is None:
+        return TEXT_ASSET_TYPES, IMAGE_ASSET_TYPES
+    return (
+        [t for t in TEXT_ASSET_TYPES if t in asset_types],
+        [t for t in IMAGE_ASSET_TYPES if t in asset_types]
+    )
+
+
+def search_text_and_images(query_vector: list, text_k: int = 5, image_k: int = 3,
+                           timeout: float = SEARCH_TIMEOUT_SECONDS, query_text: str = None,
+                           asset_types=None):
+    text_types, image_types = split_asset_types(asset_types)
+    searches = {}
+
+    if text_k > 0 and text_types:
+        searches["text"] = lambda: vector_search_text(
+            query_vector, text_k, timeout=timeout, query_text=query_text, asset_types=text_types
+        )
+    if image_k > 0 and image_types:
+        searches["image"] = lambda: vector_search_images(
+            query_vector, image_k, timeout=timeout, query_text=query_text, asset_types=image_types
+        )
+
+    results = run_searches(searches, timeout=timeout)
+
+    return search_outcome(results)
+
+
+TEXT_ASSET_TYPES = ["text", "table"]
+IMAGE_ASSET_TYPES = ["image"]
+
+
+def asset_type_filter(asset_types) -> str:
+    return " or ".join(f"asset_type eq '{t}'" for t in asset_types)
+
+
+TEXT_SELECT = [
+    "asset_type",
+    "content",
+    "metadata_storage_name",
+    "page_number",
+    "section",
+    "paragraph_number",
+    "sheet_name",
+    "row_number"
+]
+
+IMAGE_SELECT = [
+    "asset_type",
+    "image_caption",
+    "image_blob_path",
+    "metadata_storage_name",
+    "page_number"
+]
+
+
+def text_search_kwargs(query_vector: list, top_k: int, query_text: str = None, asset_types=None):
+    # with search_text set, Azure runs keyword + vector in one request
+    # and fuses them with reciprocal rank fusion
+    return dict(
+        search_text=query_text,
+        top=top_k,
         vector_queries=[{
             "kind": "vector",
-            "vector": query_vector,
+            "vector": as_list(query_vector),
             "fields": "content_vector",
             "k": top_k
         }],
-        filter="asset_type eq 'text' or asset_type eq 'table'",
-        select=[
-            "asset_type",
-            "content",
-            "metadata_storage_name",
-            "page_number",
-            "section",
-            "paragraph_number",
-            "sheet_name",
-            "row_number"
-        ]
+        filter=asset_type_filter(asset_types or TEXT_ASSET_TYPES),
+        select=TEXT_SELECT
+    )
+
+
+def image_search_kwargs(query_vector: list, top_k: int, query_text: str = None, asset_types=None):
+    return dict(
+        search_text=query_text,
+        top=top_k,
+        vector_queries=[{
+            "kind": "vector",
+            "vector": as_list(query_vector),
+            "fields": "image_vector",
+            "k": top_k
+        }],
+        filter=asset_type_filter(asset_types or IMAGE_ASSET_TYPES),
+        select=IMAGE_SELECT
     )
 
-    return [{
+
+def to_text_hit(r):
+    return {
         "type": "text",
         "content": r["content"],
         "source_file": r.get("metadata_storage_name"),
@@ -79,33 +406,97 @@ def vector_search_text(query_vector: list, top_k: int = 5):
         "sheet_name": r.get("sheet_name"),
         "row_number": r.get("row_number"),
         "score": r["@search.score"]
-    } for r in results]
-
+    }
 
-def vector_search_images(query_vector: list, top_k: int = 3):
-    results = search_client.search(
-        search_text=None,
-        vector_queries=[{
-            "kind": "vector",
-            "vector": query_vector,
-            "fields": "image_vector",
-            "k": top_k
-        }],
-        filter="asset_type eq 'image'",
-        select=[
-            "asset_type",
-            "image_caption",
-            "image_blob_path",
-            "metadata_storage_name",
-            "page_number"
-        ]
-    )
 
-    return [{
+def to_image_hit(r):
+    return {
         "type": "image",
         "caption": r["image_caption"],
         "image_path": r["image_blob_path"],
         "source_file": r.get("metadata_storage_name"),
         "page_number": r.get("page_number"),
         "score": r["@search.score"]
-    } for r in results]
+    }
+
+
+def vector_search_text(query_vector: list, top_k: int = 5, timeout: float = SEARCH_TIMEOUT_SECONDS,
+                       query_text: str = None, asset_types=None):
+    with metrics.span("search_text"):
+        results = get_search_client().search(
+            **text_search_kwargs(query_vector, top_k, query_text, asset_types),
+            timeout=timeout
+        )
+        return [to_text_hit(r) for r in results]
+
+
+def vector_search_images(query_vector: list, top_k: int = 3, timeout: float = SEARCH_TIMEOUT_SECONDS,
+                       query_text: str = None, asset_types=None):
+    with metrics.span("search_images"):
+        results = get_search_client().search(
+            **image_search_kwargs(query_vector, top_k, query_text, asset_types),
+            timeout=timeout
+        )
+        return [to_image_hit(r) for r in results]
+
+
+# ==============================
+# ASYNC SEARCH (API)
+# ==============================
+async def vector_search_text_async(query_vector: list, top_k: int = 5,
+                                   timeout: float = SEARCH_TIMEOUT_SECONDS, query_text: str = None,
+                                   asset_types=None):
+    with metrics.span("search_text"):
+        results = await get_async_search_client().search(
+            **text_search_kwargs(query_vector, top_k, query_text, asset_types),
+            timeout=timeout
+        )
+        return [to_text_hit(r) async for r in results]
+
+
+async def vector_search_images_async(query_vector: list, top_k: int = 3,
+                                     timeout: float = SEARCH_TIMEOUT_SECONDS, query_text: str = None,
+                                     asset_types=None):
+    with metrics.span("search_images"):
+        results = await get_async_search_client().search(
+            **image_search_kwargs(query_vector, top_k, query_text, asset_types),
+            timeout=timeout
+        )
+        return [to_image_hit(r) async for r in results]
+
+
+async def run_searches_async(searches: dict, timeout: float = SEARCH_TIMEOUT_SECONDS) -> dict:
+    """
+    Async counterpart of run_searches: `searches` maps a name to a
+    coroutine, all awaited together on the shared connection pool.
+    """
+    async def bounded(name, coro):
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {name} search timed out after {timeout}s")
+            return None
+
+    names = list(searches)
+    results = await asyncio.gather(*(bounded(n, searches[n]) for n in names))
+    return dict(zip(names, results))
+
+
+async def search_text_and_images_async(query_vector: list, text_k: int = 5, image_k: int = 3,
+                                       timeout: float = SEARCH_TIMEOUT_SECONDS, query_text: str = None,
+                                       asset_types=None):
+    text_types, image_types = split_asset_types(asset_types)
+    searches = {}
+
+    if text_k > 0 and text_types:
+        searches["text"] = vector_search_text_async(
+            query_vector, text_k, timeout=timeout, query_text=query_text, asset_types=text_types
+        )
+    if image_k > 0 and image_types:
+        searches["image"] = vector_search_images_async(
+            query_vector, image_k, timeout=timeout, query_text=query_text, asset_types=image_types
+        )
+
+    results = await run_searches_async(searches, timeout=timeout)
+
+    return search_outcome(results)
@@ -0,0 +1,120 @@
+# backend/services/clients.py
+# Single place where OpenAI and Azure Search clients are built.
+# Sync clients are created on first use (ingest, eval scripts); async
+# clients are opened and closed by the API lifespan.
+import os
+
+import aiohttp
+import httpx
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.search.documents import SearchClient
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
+from azure.search.documents.indexes import SearchIndexClient
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
+
+
+# ==============================
+# CONFIG
+# ==============================
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
+AZURE_SEARCH_KEY = os.getenv("AZURE_SEARCH_KEY")
+AZURE_SEARCH_INDEX_NAME = os.getenv("AZURE_SEARCH_INDEX_NAME")
+
+# Connection pool limits for the async clients
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+SEARCH_MAX_CONNECTIONS = int(os.getenv("SEARCH_MAX_CONNECTIONS", "50"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+
+_sync = {}
+_async = {}
+
+
+# ==============================
+# SYNC CLIENTS
+# ==============================
+def get_openai_client() -> OpenAI:
+    if "openai" not in _sync:
+        _sync["openai"] = OpenAI(api_key=OPENAI_API_KEY)
+    return _sync["openai"]
+
+
+def get_search_client(index_name: str = None) -> SearchClient:
+    # other index names are only used by maintenance scripts (reembed)
+    index_name = index_name or AZURE_SEARCH_INDEX_NAME
+    key = "search" if index_name == AZURE_SEARCH_INDEX_NAME else f"search:{index_name}"
+
+    if key not in _sync:
+        _sync[key] = SearchClient(
+            endpoint=AZURE_SEARCH_ENDPOINT,
+            index_name=index_name,
+            credential=AzureKeyCredential(AZURE_SEARCH_KEY)
+        )
+    return _sync[key]
+
+
+def get_search_index_client() -> SearchIndexClient:
+    if "search_index" not in _sync:
+        _sync["search_index"] = SearchIndexClient(
+            endpoint=AZURE_SEARCH_ENDPOINT,
+            credential=AzureKeyCredential(AZURE_SEARCH_KEY)
+        )
+    return _sync["search_index"]
+
+
+# ==============================
+# ASYNC CLIENTS (API lifespan)
+# ==============================
+async def open_async_clients(search: bool = True):
+    _async["openai"] = AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+    )
+
+    if not search:
+        return
+
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=SEARCH_MAX_CONNECTIONS,
+            keepalive_timeout=KEEPALIVE_EXPIRY_SECONDS
+        )
+    )
+    _async["search_session"] = session
+    _async["search"] = AsyncSearchClient(
+        endpoint=AZURE_SEARCH_ENDPOINT,
+        index_name=AZURE_SEARCH_INDEX_NAME,
+        credential=AzureKeyCredential(AZURE_SEARCH_KEY),
+        transport=AioHttpTransport(session=session, session_owner=False)
+    )
+
+
+async def close_async_clients():
+    if "openai" in _async:
+        await _async.pop("openai").close()
+    if "search" in _async:
+        await _async.pop("search").close()
+    if "search_session" in _async:
+        await _async.pop("search_session").close()
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    if "openai" not in _async:
+        raise RuntimeError("Async clients are not open; call open_async_clients() first")
+    return _async["openai"]
+
+
+def get_async_search_client() -> AsyncSearchClient:
+    if "search" not in _async:
+        raise RuntimeError("Async clients are not open; call open_async_clients() first")
+    return _async["search"]
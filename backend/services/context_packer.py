@@ -0,0 +1,112 @@
+# backend/services/context_packer.py
+# Fits retrieved evidence into a token budget before build_context.
+import os
+
+from backend.services.tokens import count_tokens
+
+
+# ==============================
+# CONFIG
+# ==============================
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+
+# share of the budget images may use before text is packed
+CONTEXT_IMAGE_SHARE = float(os.getenv("CONTEXT_IMAGE_SHARE", "0.3"))
+
+# citation line and separators around each block
+CITATION_TOKENS = 20
+
+# chunks from the same file that share at least this many characters
+# at their edges are treated as overlapping windows (see
+# CHUNK_OVERLAP_TOKENS in ingest)
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 400
+
+
+# ==============================
+# DEDUP
+# ==============================
+def _edge_overlap(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of `left` that is a prefix of `right`.
+    """
+    longest = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for n in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:n]):
+            return n
+    return 0
+
+
+def dedupe_content(content: str, kept: list):
+    """
+    Strip text `content` shares with already kept chunks of the same
+    file. Returns None when nothing new is left.
+    """
+    for other in kept:
+        if content in other:
+            return None
+
+        n = _edge_overlap(other, content)
+        if n:
+            content = content[n:]
+
+        n = _edge_overlap(content, other)
+        if n:
+            content = content[:-n]
+
+        if not content.strip():
+            return None
+
+    return content
+
+
+def _priority(hit):
+    return hit.get("rerank_score", hit.get("score") or 0.0)
+
+
+# ==============================
+# PACK
+# ==============================
+def pack_evidence(text_results, image_results, max_tokens: int = CONTEXT_MAX_TOKENS):
+    """
+    Choose the evidence that fits in `max_tokens`, best score first.
+
+    Images are packed first into their share of the budget; text takes
+    the rest. Overlapping chunk windows are trimmed so repeated text is
+    only paid for once. Hits that do not fit are skipped, so a smaller
+    one further down can still be used. Returns
+    (text_results, image_results, tokens_used) with each list back in
+    retrieval order.
+    """
+    used = 0
+
+    images = []
+    image_budget = int(max_tokens * CONTEXT_IMAGE_SHARE)
+    for i, img in sorted(enumerate(image_results), key=lambda x: _priority(x[1]), reverse=True):
+        tokens = count_tokens(img.get("caption")) + CITATION_TOKENS
+        if used + tokens > image_budget:
+            continue
+        images.append((i, img))
+        used += tokens
+
+    texts = []
+    kept_by_file = {}
+    for i, p in sorted(enumerate(text_results), key=lambda x: _priority(x[1]), reverse=True):
+        kept = kept_by_file.setdefault(p.get("source_file"), [])
+        content = dedupe_content(p["content"], kept)
+        if content is None:
+            continue
+
+        tokens = count_tokens(content) + CITATION_TOKENS
+        if used + tokens > max_tokens:
+            continue
+
+        kept.append(p["content"])
+        texts.append((i, {**p, "content": content}))
+        used += tokens
+
+    return (
+        [p for _, p in sorted(texts, key=lambda x: x[0])],
+        [img for _, img in sorted(images, key=lambda x: x[0])],
+        used
+    )
@@ -0,0 +1,149 @@
+# backend/services/embedding_cache.py
+# On-disk embedding cache shared by ingest and query paths.
+# Keyed by (model, sha256(text)); vectors stored as packed float32, or
+# float16 to halve the file.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+# ==============================
+# CONFIG
+# ==============================
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# "float32" or "float16"; float16 rows are kept under their own model key
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+
+
+_lock = threading.Lock()
+_conn = None
+_counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _connect():
+    global _conn
+
+    if _conn is None:
+        _conn = sqlite3.connect(EMBEDDING_CACHE_PATH, check_same_thread=False)
+        # WAL lets the API and an ingest run share the file
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        _conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        _conn.commit()
+
+    return _conn
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache_model(model: str) -> str:
+    return model if EMBEDDING_CACHE_DTYPE == "float32" else f"{model}@{EMBEDDING_CACHE_DTYPE}"
+
+
+def _pack(vector) -> bytes:
+    return np.asarray(vector, dtype=EMBEDDING_CACHE_DTYPE).tobytes()
+
+
+def _unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=EMBEDDING_CACHE_DTYPE).astype(np.float32)
+
+
+def get_many(model: str, texts) -> list:
+    """
+    Cached float32 vectors in the same order as `texts`; None for misses.
+    """
+    if not EMBEDDING_CACHE_ENABLED:
+        return [None] * len(texts)
+
+    model = _cache_model(model)
+    hashes = [text_hash(t) for t in texts]
+    found = {}
+
+    with _lock:
+        conn = _connect()
+        unique = list(set(hashes))
+
+        # stay under SQLite's bound-parameter limit
+        for i in range(0, len(unique), 500):
+            part = unique[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings "
+                f"WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *part]
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(time.time(), model, h) for h in found]
+            )
+            conn.commit()
+
+        hits = sum(1 for h in hashes if h in found)
+        _counters["hits"] += hits
+        _counters["misses"] += len(hashes) - hits
+
+    return [_unpack(found[h]) if h in found else None for h in hashes]
+
+
+def put_many(model: str, texts, vectors):
+    if not EMBEDDING_CACHE_ENABLED or not texts:
+        return
+
+    model = _cache_model(model)
+    now = time.time()
+    rows = [(model, text_hash(t), _pack(v), now) for t, v in zip(texts, vectors)]
+
+    with _lock:
+        conn = _connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            rows
+        )
+        _evict(conn)
+        conn.commit()
+
+
+def _evict(conn):
+    # least-recently-used entries go first
+    (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    excess = count - EMBEDDING_CACHE_MAX_ENTRIES
+
+    if excess > 0:
+        conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            "SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        _counters["evictions"] += excess
+
+
+def stats() -> dict:
+    with _lock:
+        lookups = _counters["hits"] + _counters["misses"]
+        return {
+            **_counters,
+            "hit_rate": _counters["hits"] / lookups if lookups else 0.0
+        }
@@ -0,0 +1,187 @@
+# backend/services/embeddings.py
+# Vectors are float32 NumPy arrays from the API response onwards; they
+# only become Python lists at the Azure Search wire boundary.
+import asyncio
+import base64
+import os
+
+import numpy as np
+
+from backend.services import embedding_cache, metrics
+from backend.services.clients import get_openai_client, get_async_openai_client
+
+
+# ==============================
+# CONFIG
+# ==============================
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Shorter vectors from the same model (text-embedding-3 models only);
+# 0 keeps the model's full size (1536 for -small). Ingest, queries and
+# the index must agree, so changing it means re-embedding the index
+# (see backend/ingest/reembed.py).
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+
+MODEL_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+# OpenAI accepts up to 2048 inputs per request; keep well below the
+# per-request token ceiling so one batch never gets rejected.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def iter_batches(texts, batch_size=EMBEDDING_BATCH_SIZE, max_tokens=EMBEDDING_BATCH_MAX_TOKENS):
+    """
+    Yield lists of texts bounded by both item count and estimated tokens.
+    """
+    batch = []
+    batch_tokens = 0
+
+    for text in texts:
+        tokens = estimate_tokens(text)
+
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+
+        batch.append(text)
+        batch_tokens += tokens
+
+    if batch:
+        yield batch
+
+
+def supports_dimensions(model: str = EMBEDDING_MODEL) -> bool:
+    # text-embedding-3 vectors are trained so a prefix is still a good
+    # embedding; ada-002 vectors cannot be shortened
+    return model.startswith("text-embedding-3")
+
+
+def vector_size(dimensions: int = EMBEDDING_DIMENSIONS) -> int:
+    """
+    Length of the vectors embed_texts returns, i.e. what the index
+    vector fields must be declared with.
+    """
+    return dimensions or MODEL_DIMENSIONS.get(EMBEDDING_MODEL, 1536)
+
+
+def embedding_key(dimensions: int = EMBEDDING_DIMENSIONS) -> str:
+    # cache entries of different sizes must never mix
+    return f"{EMBEDDING_MODEL}:{dimensions}" if dimensions else EMBEDDING_MODEL
+
+
+def _request(batch, dimensions):
+    request = dict(model=EMBEDDING_MODEL, input=batch, encoding_format="base64")
+    if dimensions:
+        request["dimensions"] = dimensions
+    return request
+
+
+def embed_texts(texts, batch_size=EMBEDDING_BATCH_SIZE, max_tokens=EMBEDDING_BATCH_MAX_TOKENS,
+                dimensions=EMBEDDING_DIMENSIONS) -> np.ndarray:
+    """
+    Embed many texts with one API call per batch.
+    Returns a (len(texts), dims) float32 matrix in the order of `texts`.
+
+    Texts already in the embedding cache, and repeats within `texts`,
+    are not sent to the API.
+    """
+    texts = list(texts)
+    key = embedding_key(dimensions)
+    vectors = embedding_cache.get_many(key, texts)
+    fresh = {}
+
+    for batch in iter_batches(_missing(texts, vectors), batch_size, max_tokens):
+        response = get_openai_client().embeddings.create(**_request(batch, dimensions))
+        fresh.update(_store(key, batch, response))
+
+    return _stack(texts, vectors, fresh)
+
+
+async def embed_texts_async(texts, batch_size=EMBEDDING_BATCH_SIZE, max_tokens=EMBEDDING_BATCH_MAX_TOKENS,
+                            dimensions=EMBEDDING_DIMENSIONS) -> np.ndarray:
+    texts = list(texts)
+    key = embedding_key(dimensions)
+    # the SQLite cache does blocking disk I/O; keep it off the event loop
+    vectors = await asyncio.to_thread(embedding_cache.get_many, key, texts)
+    fresh = {}
+
+    for batch in iter_batches(_missing(texts, vectors), batch_size, max_tokens):
+        response = await get_async_openai_client().embeddings.create(**_request(batch, dimensions))
+        batch_vectors = _decode(response)
+        await asyncio.to_thread(embedding_cache.put_many, key, batch, batch_vectors)
+        fresh.update(_record(batch, batch_vectors, response))
+
+    return _stack(texts, vectors, fresh)
+
+
+def _missing(texts, cached):
+    # each distinct uncached text is embedded once
+    return list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+
+
+def decode_embedding(embedding) -> np.ndarray:
+    # base64 is the raw little-endian float32 buffer: no per-float objects
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def _stack(texts, cached, fresh) -> np.ndarray:
+    rows = [v if v is not None else fresh[t] for t, v in zip(texts, cached)]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack(rows).astype(np.float32, copy=False)
+
+
+def _decode(response) -> list:
+    # the API tags each vector with its input position
+    ordered = sorted(response.data, key=lambda d: d.index)
+    return [decode_embedding(d.embedding) for d in ordered]
+
+
+def _record(batch, batch_vectors, response) -> dict:
+    metrics.record_usage(EMBEDDING_MODEL, response.usage)
+    return dict(zip(batch, batch_vectors))
+
+
+def _store(key, batch, response) -> dict:
+    batch_vectors = _decode(response)
+    embedding_cache.put_many(key, batch, batch_vectors)
+    return _record(batch, batch_vectors, response)
+
+
+def embed_query(query: str) -> np.ndarray:
+    with metrics.span("embed_query"):
+        return embed_texts([query])[0]
+
+
+async def embed_query_async(query: str) -> np.ndarray:
+    with metrics.span("embed_query"):
+        return (await embed_texts_async([query]))[0]
+
+
+def truncate_embeddings(vectors, dimensions: int) -> np.ndarray:
+    """
+    Shorten full-size text-embedding-3 vectors locally: keep the first
+    `dimensions` values and re-normalise, which is what the API does for
+    the `dimensions` parameter. Lets an index be shrunk (or several sizes
+    compared) without calling the API again.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not dimensions or dimensions >= vectors.shape[-1]:
+        return vectors
+
+    short = vectors[..., :dimensions]
+    norms = np.linalg.norm(short, axis=-1, keepdims=True)
+    return short / np.where(norms == 0, 1.0, norms)
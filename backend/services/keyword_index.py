@@ -0,0 +1,104 @@
+# backend/services/keyword_index.py
+# In-memory BM25 inverted index used by the local backend's hybrid mode.
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps SOP tokens whole: "2.5", "iso-9001", "5/2021", "swl"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+class BM25Index:
+    """
+    Rows are the same integer row ids the vector matrix uses, so the
+    two result lists can be fused directly.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(list)   # term -> [(row, tf), ...]
+        self._arrays = {}                    # term -> (rows, tfs) cache
+        self._lengths = []
+        self._total_length = 0
+
+    def add(self, row: int, text: str):
+        # rows arrive in order; pad for rows without text
+        while len(self._lengths) < row:
+            self._lengths.append(0)
+
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._lengths.append(length)
+        self._total_length += length
+
+        for term, tf in terms.items():
+            self._postings[term].append((row, tf))
+            self._arrays.pop(term, None)
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _term_arrays(self, term):
+        if term not in self._arrays:
+            postings = self._postings.get(term, [])
+            self._arrays[term] = (
+                np.fromiter((r for r, _ in postings), dtype=np.int64, count=len(postings)),
+                np.fromiter((tf for _, tf in postings), dtype=np.float32, count=len(postings))
+            )
+        return self._arrays[term]
+
+    def search(self, query: str, top_n: int, mask=None):
+        """
+        Returns (rows, scores) of the best `top_n` rows, best first.
+        `mask` is a boolean array over rows; False rows are skipped.
+        """
+        n_docs = len(self._lengths)
+        terms = set(tokenize(query))
+        if not n_docs or not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        avg_length = self._total_length / n_docs or 1.0
+        scores = np.zeros(n_docs, dtype=np.float32)
+
+        for term in terms:
+            rows, tfs = self._term_arrays(term)
+            if not len(rows):
+                continue
+
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / avg_length)
+            scores[rows] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        if mask is not None:
+            scores[~mask[:n_docs]] = 0.0
+
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched):
+            return matched, scores[matched]
+
+        k = min(top_n, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+
+        return top, scores[top]
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60) -> dict:
+    """
+    Fuse ranked lists of row ids: score = sum of 1 / (k + rank).
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[int(row)] += 1.0 / (k + rank)
+    return fused
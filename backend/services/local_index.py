@@ -0,0 +1,792 @@
+# backend/services/local_index.py
+# In-process vector index, a drop-in for Azure AI Search when
+# SEARCH_BACKEND=local. Vectors live in append-only float32 files that
+# are memory-mapped for search; metadata and deletions are JSON lines.
+import asyncio
+import io
+import json
+import os
+import threading
+
+import numpy as np
+
+from backend.services.azure_search import (
+    to_text_hit,
+    to_image_hit,
+    split_asset_types,
+    SEARCH_TIMEOUT_SECONDS,
+    TEXT_ASSET_TYPES,
+    IMAGE_ASSET_TYPES
+)
+from backend.services import metrics
+from backend.services.keyword_index import BM25Index, reciprocal_rank_fusion
+
+
+# ==============================
+# CONFIG
+# ==============================
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", ".local_index")
+
+KEY_FIELD = "metadata_storage_path"
+VECTOR_FIELDS = ("content_vector", "image_vector")
+
+# Field each vector's keyword (BM25) side is built from
+KEYWORD_FIELDS = {"content_vector": "content", "image_vector": "image_caption"}
+
+# Hybrid search fuses this many vector and keyword candidates per hit
+HYBRID_CANDIDATES = int(os.getenv("LOCAL_INDEX_HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Approximate search (IVF): vectors are clustered into NLIST lists and a
+# query only scans the NPROBE closest lists. Small fields stay brute force.
+LOCAL_INDEX_ANN = os.getenv("LOCAL_INDEX_ANN", "ivf")
+LOCAL_INDEX_ANN_MIN_ROWS = int(os.getenv("LOCAL_INDEX_ANN_MIN_ROWS", "20000"))
+LOCAL_INDEX_IVF_NLIST = int(os.getenv("LOCAL_INDEX_IVF_NLIST", "0"))   # 0 = 4 * sqrt(rows)
+LOCAL_INDEX_IVF_NPROBE = int(os.getenv("LOCAL_INDEX_IVF_NPROBE", "16"))
+LOCAL_INDEX_IVF_TRAIN_SAMPLE = int(os.getenv("LOCAL_INDEX_IVF_TRAIN_SAMPLE", "50000"))
+LOCAL_INDEX_IVF_RETRAIN_GROWTH = float(os.getenv("LOCAL_INDEX_IVF_RETRAIN_GROWTH", "4"))
+
+# Compact copy of the vectors kept in RAM and scanned first: "none",
+# "float16" (2 bytes/dim) or "int8" (1 byte/dim + a per-row scale). The
+# best top_k * RESCORE_FACTOR candidates are then rescored against the
+# float32 file, which stays on disk.
+LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "none")
+LOCAL_INDEX_RESCORE_FACTOR = int(os.getenv("LOCAL_INDEX_RESCORE_FACTOR", "4"))
+
+QUANTIZED_FILES = {
+    "float16": ("f16", np.float16),
+    "int8": ("q8", np.int8),
+}
+
+
+
+class LocalVectorIndex:
+    """
+    One float32 matrix per vector field, with the same metadata fields
+    as the Azure index. Writes only ever append:
+
+        <field>.f32       row-major vectors, unit-normalised
+        <field>.jsonl     one metadata line per vector row
+        tombstones.jsonl  rows that were deleted or replaced
+
+    Once a field is large enough it also gets an IVF index:
+
+        <field>.centroids.npy    coarse quantizer (k-means centroids)
+        <field>.ivf_assign.i32   list id of every vector row
+        <field>.ivf.json         training parameters
+
+    With LOCAL_INDEX_QUANTIZATION set, a compact copy is appended too:
+
+        <field>.f16 or <field>.q8 (+ <field>.q8scale, float32 per row)
+
+    Searches re-map the files when another process (ingest) has
+    appended to them.
+    """
+
+    def __init__(self, path=LOCAL_INDEX_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._load()
+
+    # ------------------------------
+    # Loading
+    # ------------------------------
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _file_stamp(self):
+        stamp = []
+
+        for name in sorted(os.listdir(self.path)):
+            # _atomic_write's temp files come and go mid-write
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(self._file(name))
+            except FileNotFoundError:
+                continue
+            stamp.append((name, stat.st_size, stat.st_mtime_ns))
+
+        return tuple(stamp)
+
+    def _read_jsonl(self, name):
+        rows = []
+        if not os.path.exists(self._file(name)):
+            return rows
+
+        with open(self._file(name), "r", encoding="utf-8") as f:
+            for line in f:
+                # a writer may be mid-line; skip the unfinished tail
+                if not line.endswith("\n"):
+                    break
+                rows.append(json.loads(line))
+
+        return rows
+
+    def _map_vectors(self, field, n_rows):
+        vector_file = self._file(f"{field}.f32")
+        if not self._dim or not os.path.exists(vector_file):
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+
+        available = os.path.getsize(vector_file) // (4 * self._dim)
+        n_rows = min(n_rows, available)
+        if n_rows == 0:
+            return np.zeros((0, self._dim), dtype=np.float32)
+
+        return np.memmap(vector_file, dtype=np.float32, mode="r", shape=(n_rows, self._dim))
+
+    def _load(self):
+        with self._lock:
+            meta = {}
+            if os.path.exists(self._file("meta.json")):
+                with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+
+            self._dim = meta.get("dim")
+            self._fields = {}
+            self._live = {}
+
+            for field in VECTOR_FIELDS:
+                rows = self._read_jsonl(f"{field}.jsonl")
+                matrix = self._map_vectors(field, len(rows))
+                rows = rows[:matrix.shape[0]]
+
+                state = {
+                    "rows": rows,
+                    "matrix": matrix,
+                    "alive": np.ones(len(rows), dtype=bool),
+                    "asset_types": np.array([r.get("asset_type") or "" for r in rows], dtype=object)
+                }
+                self._fields[field] = state
+
+                state["bm25"] = BM25Index()
+                for i, r in enumerate(rows):
+                    self._replace_live(r[KEY_FIELD], field, i)
+                    state["bm25"].add(i, r.get(KEYWORD_FIELDS[field]))
+
+                self._load_ivf(field)
+                self._load_quantized(field)
+
+            for t in self._read_jsonl("tombstones.jsonl"):
+                state = self._fields.get(t["field"])
+                if state is not None and t["row"] < len(state["rows"]):
+                    state["alive"][t["row"]] = False
+                    if self._live.get(t["key"]) == (t["field"], t["row"]):
+                        del self._live[t["key"]]
+
+            self._stamp = self._file_stamp()
+
+    def _load_ivf(self, field):
+        state = self._fields[field]
+        state["ivf"] = None
+
+        centroid_file = self._file(f"{field}.centroids.npy")
+        if LOCAL_INDEX_ANN != "ivf" or not os.path.exists(centroid_file):
+            return
+
+        centroids = np.load(centroid_file)
+        if centroids.shape[1] != self._dim:
+            return
+
+        assign_file = self._file(f"{field}.ivf_assign.i32")
+        assign = np.fromfile(assign_file, dtype=np.int32) if os.path.exists(assign_file) else np.zeros(0, np.int32)
+        assign = assign[:len(state["rows"])]
+
+        # rows appended after the writer last saved assignments
+        if len(assign) < len(state["rows"]):
+            assign = np.concatenate([assign, assign_to_lists(state["matrix"][len(assign):], centroids)])
+
+        with open(self._file(f"{field}.ivf.json"), "r", encoding="utf-8") as f:
+            params = json.load(f)
+
+        state["ivf"] = {
+            "centroids": centroids,
+            "assign": assign,
+            "trained_rows": params["trained_rows"],
+            "lists": None
+        }
+
+    def _load_quantized(self, field):
+        state = self._fields[field]
+        state["quantized"] = None
+
+        if LOCAL_INDEX_QUANTIZATION not in QUANTIZED_FILES or not self._dim:
+            return
+
+        suffix, dtype = QUANTIZED_FILES[LOCAL_INDEX_QUANTIZATION]
+        n_rows = len(state["rows"])
+
+        codes_file = self._file(f"{field}.{suffix}")
+        codes = np.fromfile(codes_file, dtype=dtype) if os.path.exists(codes_file) else np.zeros(0, dtype)
+        stored = min(len(codes) // self._dim, n_rows)
+        codes = codes[:stored * self._dim].reshape(stored, self._dim)
+
+        scales = None
+        if dtype == np.int8:
+            scale_file = self._file(f"{field}.q8scale")
+            scales = np.fromfile(scale_file, dtype=np.float32) if os.path.exists(scale_file) else np.zeros(0, np.float32)
+            stored = min(stored, len(scales))
+            codes, scales = codes[:stored], scales[:stored]
+
+        # rows appended after the writer last saved codes (or an index
+        # built before quantization was turned on)
+        if stored < n_rows:
+            tail_codes, tail_scales = quantize(state["matrix"][stored:], LOCAL_INDEX_QUANTIZATION)
+            codes = np.concatenate([codes, tail_codes])
+            if scales is not None:
+                scales = np.concatenate([scales, tail_scales])
+
+        state["quantized"] = {"codes": codes, "scales": scales, "stored": stored}
+
+    def _replace_live(self, key, field, row):
+        previous = self._live.get(key)
+        if previous is not None:
+            self._fields[previous[0]]["alive"][previous[1]] = False
+        self._live[key] = (field, row)
+        return previous
+
+    def _maybe_reload(self):
+        if self._file_stamp() != self._stamp:
+            self._load()
+
+    # ------------------------------
+    # Writes
+    # ------------------------------
+    def upsert(self, documents):
+        """
+        Add or replace documents, keyed by metadata_storage_path.
+        Each document carries exactly one of the vector fields.
+        """
+        with self._lock:
+            self._maybe_reload()
+
+            vectors = {field: [] for field in VECTOR_FIELDS}
+            metadata = {field: [] for field in VECTOR_FIELDS}
+            tombstones = []
+            keys = []
+
+            for doc in documents:
+                field = "image_vector" if doc.get("image_vector") is not None else "content_vector"
+                vector = _unit(doc[field])
+
+                if self._dim is None:
+                    self._dim = len(vector)
+                    with open(self._file("meta.json"), "w", encoding="utf-8") as f:
+                        json.dump({"dim": self._dim}, f)
+                elif len(vector) != self._dim:
+                    raise ValueError(f"vector has {len(vector)} dims, index has {self._dim}")
+
+                state = self._fields[field]
+                row = len(state["rows"]) + len(metadata[field])
+                meta = {k: v for k, v in doc.items() if k not in VECTOR_FIELDS}
+
+                previous = self._live.get(meta[KEY_FIELD])
+                if previous is not None:
+                    tombstones.append({"key": meta[KEY_FIELD], "field": previous[0], "row": previous[1]})
+                self._live[meta[KEY_FIELD]] = (field, row)
+
+                vectors[field].append(vector)
+                metadata[field].append(meta)
+                keys.append(meta[KEY_FIELD])
+
+            for field in VECTOR_FIELDS:
+                if not metadata[field]:
+                    continue
+
+                # vectors first: readers only trust rows that have metadata
+                with open(self._file(f"{field}.f32"), "ab") as f:
+                    f.write(np.stack(vectors[field]).astype(np.float32).tobytes())
+                with open(self._file(f"{field}.jsonl"), "a", encoding="utf-8") as f:
+                    for meta in metadata[field]:
+                        f.write(json.dumps(meta, default=str) + "\n")
+
+                state = self._fields[field]
+                for i, meta in enumerate(metadata[field], start=len(state["rows"])):
+                    state["bm25"].add(i, meta.get(KEYWORD_FIELDS[field]))
+                state["rows"].extend(metadata[field])
+                state["alive"] = np.concatenate([state["alive"], np.ones(len(metadata[field]), dtype=bool)])
+                state["asset_types"] = np.concatenate([
+                    state["asset_types"],
+                    np.array([m.get("asset_type") or "" for m in metadata[field]], dtype=object)
+                ])
+                state["matrix"] = self._map_vectors(field, len(state["rows"]))
+
+                self._extend_ivf(field, len(metadata[field]))
+                self._extend_quantized(field)
+
+            self._write_tombstones(tombstones)
+
+            for field in VECTOR_FIELDS:
+                self._maybe_train_ivf(field)
+
+            self._stamp = self._file_stamp()
+
+            return keys
+
+    def delete(self, keys):
+        with self._lock:
+            self._maybe_reload()
+
+            tombstones = []
+            for key in keys:
+                previous = self._live.pop(key, None)
+                if previous is not None:
+                    tombstones.append({"key": key, "field": previous[0], "row": previous[1]})
+
+            self._write_tombstones(tombstones)
+            self._stamp = self._file_stamp()
+
+            return len(tombstones)
+
+    def iter_documents(self, batch_size=1000):
+        """
+        Yield batches of live documents with their stored vectors, in the
+        shape upsert() takes.
+        """
+        self._maybe_reload()
+
+        for field in VECTOR_FIELDS:
+            with self._lock:
+                state = self._fields[field]
+                rows = np.flatnonzero(state["alive"])
+
+            for start in range(0, len(rows), batch_size):
+                picked = rows[start:start + batch_size]
+                with self._lock:
+                    vectors = np.asarray(state["matrix"][picked])
+                    batch = [{**state["rows"][r], field: v} for r, v in zip(picked, vectors)]
+                yield batch
+
+    # ------------------------------
+    # IVF maintenance (writer side)
+    # ------------------------------
+    def _extend_ivf(self, field, n_new):
+        state = self._fields[field]
+        ivf = state["ivf"]
+        if ivf is None:
+            return
+
+        start = len(state["rows"]) - n_new
+        new_assign = assign_to_lists(state["matrix"][start:], ivf["centroids"])
+        ivf["assign"] = np.concatenate([ivf["assign"][:start], new_assign])
+        ivf["lists"] = None
+
+        assign_file = self._file(f"{field}.ivf_assign.i32")
+        stored = os.path.getsize(assign_file) // 4 if os.path.exists(assign_file) else 0
+
+        if stored == start:
+            with open(assign_file, "ab") as f:
+                f.write(new_assign.astype(np.int32).tobytes())
+        else:
+            _atomic_write(assign_file, ivf["assign"].astype(np.int32).tobytes())
+
+    def _extend_quantized(self, field):
+        if LOCAL_INDEX_QUANTIZATION not in QUANTIZED_FILES:
+            return
+
+        state = self._fields[field]
+        quantized = state["quantized"]
+        if quantized is None:
+            self._load_quantized(field)
+            quantized = state["quantized"]
+
+        start = quantized["codes"].shape[0]
+        codes, scales = quantize(state["matrix"][start:], LOCAL_INDEX_QUANTIZATION)
+        quantized["codes"] = np.concatenate([quantized["codes"], codes])
+        if scales is not None:
+            quantized["scales"] = np.concatenate([quantized["scales"], scales])
+
+        # persist every row the files lack; rewrite if they do not line up
+        suffix, dtype = QUANTIZED_FILES[LOCAL_INDEX_QUANTIZATION]
+        files = [(self._file(f"{field}.{suffix}"), quantized["codes"], np.dtype(dtype).itemsize * self._dim)]
+        if scales is not None:
+            files.append((self._file(f"{field}.q8scale"), quantized["scales"], 4))
+
+        stored = quantized["stored"]
+        for path, values, row_bytes in files:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size == stored * row_bytes:
+                with open(path, "ab") as f:
+                    f.write(values[stored:].tobytes())
+            else:
+                _atomic_write(path, values.tobytes())
+
+        quantized["stored"] = quantized["codes"].shape[0]
+
+    def _maybe_train_ivf(self, field):
+        if LOCAL_INDEX_ANN != "ivf":
+            return
+
+        state = self._fields[field]
+        live = int(state["alive"].sum())
+        ivf = state["ivf"]
+
+        if live < LOCAL_INDEX_ANN_MIN_ROWS:
+            return
+        if ivf is not None and live < ivf["trained_rows"] * LOCAL_INDEX_IVF_RETRAIN_GROWTH:
+            return
+
+        self.train_ivf(field)
+
+    def train_ivf(self, field, nlist=None):
+        """
+        (Re)build the IVF lists for one field from its live vectors.
+        """
+        with self._lock:
+            state = self._fields[field]
+            live_rows = np.flatnonzero(state["alive"])
+            if not len(live_rows):
+                return
+
+            nlist = nlist or LOCAL_INDEX_IVF_NLIST or int(4 * np.sqrt(len(live_rows)))
+            nlist = max(1, min(nlist, len(live_rows)))
+            print(f"🧭 Training IVF for {field}: {len(live_rows)} vectors, {nlist} lists")
+
+            rng = np.random.default_rng(0)
+            sample_size = min(len(live_rows), max(LOCAL_INDEX_IVF_TRAIN_SAMPLE, 40 * nlist))
+            sample = np.sort(rng.choice(live_rows, sample_size, replace=False))
+
+            centroids = train_kmeans(np.asarray(state["matrix"][sample]), nlist, rng=rng)
+            assign = assign_to_lists(state["matrix"], centroids)
+
+            # assignments before centroids: a reader that sees new
+            # centroids also sees matching assignments
+            _atomic_write(self._file(f"{field}.ivf_assign.i32"), assign.astype(np.int32).tobytes())
+            with open(self._file(f"{field}.ivf.json"), "w", encoding="utf-8") as f:
+                json.dump({"nlist": nlist, "trained_rows": len(live_rows)}, f)
+            buf = io.BytesIO()
+            np.save(buf, centroids)
+            _atomic_write(self._file(f"{field}.centroids.npy"), buf.getvalue())
+
+            state["ivf"] = {
+                "centroids": centroids,
+                "assign": assign,
+                "trained_rows": len(live_rows),
+                "lists": None
+            }
+            self._stamp = self._file_stamp()
+
+    def _write_tombstones(self, tombstones):
+        if not tombstones:
+            return
+
+        with open(self._file("tombstones.jsonl"), "a", encoding="utf-8") as f:
+            for t in tombstones:
+                f.write(json.dumps(t) + "\n")
+
+        for t in tombstones:
+            self._fields[t["field"]]["alive"][t["row"]] = False
+
+    # ------------------------------
+    # Search
+    # ------------------------------
+    def search(self, field, query_vector, top_k, asset_types=None, nprobe=None, exact=False,
+               query_text=None, rescore=None):
+        """
+        Top-k rows by cosine similarity. Scores use Azure's convention
+        for cosine, 1 / (1 + distance), so thresholds carry over.
+
+        Uses the IVF lists when the field has them, scanning the `nprobe`
+        closest lists, and the quantized vectors when there are any,
+        rescoring the best `top_k * rescore` in full precision
+        (`rescore=0` keeps the quantized scores). `exact=True` forces a
+        brute-force float32 scan.
+
+        With `query_text`, runs hybrid search instead: vector and BM25
+        candidates are fused with reciprocal rank fusion and the score
+        is the RRF score, as in Azure's hybrid queries.
+        """
+        self._maybe_reload()
+
+        with self._lock:
+            state = self._fields[field]
+            if not len(state["rows"]):
+                return []
+
+            if len(query_vector) != self._dim:
+                raise ValueError(
+                    f"query has {len(query_vector)} dims, index has {self._dim}; "
+                    f"EMBEDDING_DIMENSIONS must match the index (re-embed with backend/ingest/reembed.py)"
+                )
+
+            mask = state["alive"]
+            if asset_types:
+                mask = mask & np.isin(state["asset_types"], asset_types)
+
+            if query_text:
+                n = max(top_k, HYBRID_CANDIDATES)
+                vector_rows, _ = self._vector_top(state, query_vector, n, mask, nprobe, exact, rescore)
+                keyword_rows, _ = state["bm25"].search(query_text, n, mask)
+
+                fused = reciprocal_rank_fusion([vector_rows, keyword_rows], k=RRF_K)
+                best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+                return [{**state["rows"][row], "@search.score": score} for row, score in best]
+
+            rows, scores = self._vector_top(state, query_vector, top_k, mask, nprobe, exact, rescore)
+
+            return [
+                {**state["rows"][row], "@search.score": 1.0 / (2.0 - float(score))}
+                for row, score in zip(rows, scores)
+            ]
+
+    def _vector_top(self, state, query_vector, top_k, mask, nprobe=None, exact=False, rescore=None):
+        query = _unit(query_vector)
+        candidates = None
+
+        if state["ivf"] is not None and not exact:
+            candidates = self._ivf_candidates(state, query, nprobe or LOCAL_INDEX_IVF_NPROBE)
+            candidates = candidates[mask[candidates]]
+            # too selective a filter for the probed lists: scan everything
+            if len(candidates) < top_k:
+                candidates = None
+
+        if candidates is None:
+            candidates = np.flatnonzero(mask)
+
+        k = min(top_k, len(candidates))
+        if k <= 0:
+            return [], []
+
+        quantized = state["quantized"]
+        if quantized is not None and not exact:
+            rescore = LOCAL_INDEX_RESCORE_FACTOR if rescore is None else rescore
+            approx = quantized_scores(quantized, candidates, query)
+
+            if not rescore:
+                return _top(candidates, approx, k)
+
+            candidates, _ = _top(candidates, approx, min(len(candidates), k * rescore))
+
+        scores = np.asarray(state["matrix"][candidates] @ query)
+
+        return _top(candidates, scores, k)
+
+    def _ivf_candidates(self, state, query, nprobe):
+        ivf = state["ivf"]
+
+        if ivf["lists"] is None:
+            # rows grouped by list id, plus where each list starts
+            order = np.argsort(ivf["assign"], kind="stable")
+            bounds = np.searchsorted(ivf["assign"][order], np.arange(len(ivf["centroids"]) + 1))
+            ivf["lists"] = (order, bounds)
+
+        order, bounds = ivf["lists"]
+        nprobe = min(nprobe, len(ivf["centroids"]))
+        probes = np.argpartition(-(ivf["centroids"] @ query), nprobe - 1)[:nprobe]
+
+        return np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes])
+
+    def __len__(self):
+        return len(self._live)
+
+
+def _unit(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top(rows, scores, k):
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return rows[top], scores[top]
+
+
+def _atomic_write(path, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# ==============================
+# QUANTIZATION
+# ==============================
+def quantize(vectors, kind):
+    """
+    (codes, scales) for unit float32 rows. int8 uses one symmetric scale
+    per row; float16 needs none.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    if kind == "float16":
+        return vectors.astype(np.float16), None
+
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0, np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantized_scores(quantized, rows, query, chunk=8192):
+    # dequantize a block at a time so the float32 copy stays small
+    scores = np.empty(len(rows), dtype=np.float32)
+
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        part = quantized["codes"][block].astype(np.float32) @ query
+        if quantized["scales"] is not None:
+            part *= quantized["scales"][block]
+        scores[start:start + chunk] = part
+
+    return scores
+
+
+def bytes_per_vector(dim, kind=LOCAL_INDEX_QUANTIZATION) -> int:
+    if kind == "int8":
+        return dim + 4
+    if kind == "float16":
+        return 2 * dim
+    return 4 * dim
+
+
+# ==============================
+# IVF
+# ==============================
+def train_kmeans(vectors, nlist, iterations=10, rng=None):
+    """
+    Spherical k-means over unit vectors; returns unit centroids.
+    """
+    rng = rng or np.random.default_rng(0)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = assign_to_lists(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+
+        # re-seed empty lists from random vectors
+        empty = np.bincount(assign, minlength=nlist) == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+
+        centroids = _unit_rows(sums)
+
+    return centroids
+
+
+def assign_to_lists(vectors, centroids, chunk=65536):
+    assign = np.empty(len(vectors), dtype=np.int32)
+
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk])
+        assign[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+
+    return assign
+
+
+def recall_at_k(index, field, queries, k=10, nprobe=None, asset_types=None, rescore=None):
+    """
+    Fraction of the exact top-k that the approximate search (IVF and/or
+    quantized) also returns, averaged over `queries`.
+    """
+    hits = 0
+    total = 0
+
+    for query in queries:
+        exact = {r[KEY_FIELD] for r in index.search(field, query, k, asset_types, exact=True)}
+        approx = {r[KEY_FIELD] for r in index.search(field, query, k, asset_types, nprobe=nprobe, rescore=rescore)}
+        hits += len(exact & approx)
+        total += len(exact)
+
+    return hits / total if total else 1.0
+
+
+# ==============================
+# BACKEND FUNCTIONS
+# Same signatures as backend/services/azure_search.py
+# ==============================
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_local_index() -> LocalVectorIndex:
+    global _index
+
+    with _index_lock:
+        if _index is None:
+            _index = LocalVectorIndex(LOCAL_INDEX_PATH)
+        return _index
+
+
+def upload_documents(documents, batch_size=100, **kwargs):
+    index = get_local_index()
+    report = {"succeeded": [], "failed": []}
+    batch = []
+
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            report["succeeded"].extend(index.upsert(batch))
+            batch = []
+
+    if batch:
+        report["succeeded"].extend(index.upsert(batch))
+
+    return report
+
+
+def delete_documents(keys, batch_size=1000):
+    keys = list(keys)
+    if keys:
+        print(f"🗑️ Deleting {len(keys)} stale documents")
+        get_local_index().delete(keys)
+
+
+def vector_search_text(query_vector, top_k: int = 5, timeout: float = None, query_text: str = None,
+                       asset_types=None):
+    with metrics.span("search_text"):
+        results = get_local_index().search(
+            "content_vector", query_vector, top_k, asset_types or TEXT_ASSET_TYPES, query_text=query_text
+        )
+        return [to_text_hit(r) for r in results]
+
+
+def vector_search_images(query_vector, top_k: int = 3, timeout: float = None, query_text: str = None,
+                         asset_types=None):
+    with metrics.span("search_images"):
+        results = get_local_index().search(
+            "image_vector", query_vector, top_k, asset_types or IMAGE_ASSET_TYPES, query_text=query_text
+        )
+        return [to_image_hit(r) for r in results]
+
+
+def search_text_and_images(query_vector, text_k: int = 5, image_k: int = 3, timeout: float = None,
+                           query_text: str = None, asset_types=None):
+    text_types, image_types = split_asset_types(asset_types)
+
+    # in-process and sub-millisecond: no need for a thread pool
+    return (
+        vector_search_text(query_vector, text_k, query_text=query_text, asset_types=text_types)
+        if text_k > 0 and text_types else [],
+        vector_search_images(query_vector, image_k, query_text=query_text, asset_types=image_types)
+        if image_k > 0 and image_types else [],
+        True
+    )
+
+
+async def search_text_and_images_async(query_vector, text_k: int = 5, image_k: int = 3,
+                                       timeout: float = SEARCH_TIMEOUT_SECONDS, query_text: str = None,
+                                       asset_types=None):
+    # a reload after ingest rereads the JSONL files and rebuilds BM25;
+    # keep that off the event loop
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(
+                search_text_and_images, query_vector, text_k, image_k,
+                query_text=query_text, asset_types=asset_types
+            ),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        print(f"⚠️ local search timed out after {timeout}s")
+        return [], [], False
@@ -0,0 +1,189 @@
+# backend/services/metrics.py
+# Latency, token and error metrics for the query path.
+#
+# Each stage of a request runs inside span(stage), which records its
+# duration three ways: in a Prometheus histogram, in the per-request
+# timings block when the request asked for one (collect()), and as an
+# OpenTelemetry span when tracing is on. render() returns every metric
+# in the Prometheus text format for /metrics.
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+try:
+    from opentelemetry import trace
+except ImportError:  # tracing is optional
+    trace = None
+
+
+# ==============================
+# CONFIG
+# ==============================
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# lets a request ask for its own timings with ?debug=true
+DEBUG_TIMINGS_ENABLED = os.getenv("DEBUG_TIMINGS_ENABLED", "false").lower() == "true"
+
+# spans go to whatever tracer provider the process configured
+# (e.g. via opentelemetry-instrument); needs opentelemetry-api
+OTEL_TRACING_ENABLED = os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+_tracer = trace.get_tracer("sop-rag") if trace is not None and OTEL_TRACING_ENABLED else None
+_request = ContextVar("rag_request_metrics", default=None)
+
+
+# ==============================
+# METRICS
+# ==============================
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Time spent in each stage of a request", ["stage"],
+                          buckets=LATENCY_BUCKETS)
+STAGE_ERRORS = Counter("rag_stage_errors_total", "Exceptions raised inside a stage", ["stage", "error"])
+
+REQUEST_SECONDS = Histogram("rag_request_seconds", "HTTP request latency until the response starts", ["endpoint"],
+                            buckets=LATENCY_BUCKETS)
+REQUESTS = Counter("rag_requests_total", "HTTP requests by endpoint and status code", ["endpoint", "status"])
+ERRORS = Counter("rag_errors_total", "Errors returned to clients", ["endpoint", "error"])
+
+OPENAI_TOKENS = Counter("rag_openai_tokens_total", "Tokens reported by OpenAI responses", ["model", "kind"])
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+# ==============================
+# SPANS
+# ==============================
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Time one stage. Exceptions are counted and re-raised. Durations of
+    a stage that runs more than once in a request are summed.
+    """
+    start = time.perf_counter()
+    otel = _tracer.start_as_current_span(f"rag.{stage}", attributes=attributes) if _tracer else nullcontext()
+
+    with otel:
+        try:
+            yield
+        except Exception as e:
+            if METRICS_ENABLED:
+                STAGE_ERRORS.labels(stage=stage, error=type(e).__name__).inc()
+            raise
+        finally:
+            observe(stage, time.perf_counter() - start)
+
+
+def observe(stage: str, seconds: float):
+    if METRICS_ENABLED:
+        STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+    current = _request.get()
+    if current is not None:
+        timings = current["timings_ms"]
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 2)
+
+
+def record_usage(model: str, usage):
+    """
+    Count prompt/completion tokens from a response's `usage`; the
+    request's timings block gets them per model.
+    """
+    if usage is None:
+        return
+
+    tokens = {
+        "prompt": getattr(usage, "prompt_tokens", None) or 0,
+        "completion": getattr(usage, "completion_tokens", None) or 0,
+    }
+
+    current = _request.get()
+    for kind, count in tokens.items():
+        if count:
+            if METRICS_ENABLED:
+                OPENAI_TOKENS.labels(model=model, kind=kind).inc(count)
+            if current is not None:
+                per_model = current["tokens"].setdefault(model, {})
+                per_model[f"{kind}_tokens"] = per_model.get(f"{kind}_tokens", 0) + count
+
+
+def count_request(endpoint: str, status, seconds: float):
+    if METRICS_ENABLED:
+        REQUEST_SECONDS.labels(endpoint=endpoint).observe(seconds)
+        REQUESTS.labels(endpoint=endpoint, status=str(status)).inc()
+
+
+def count_error(endpoint: str, error: str):
+    if METRICS_ENABLED:
+        ERRORS.labels(endpoint=endpoint, error=error).inc()
+
+
+@contextmanager
+def collect():
+    """
+    Gather the timings and token counts of everything run inside the
+    block (including worker threads started with a copied context):
+
+        with metrics.collect() as debug:
+            result = ...
+        result["timings"] = debug
+    """
+    current = {"timings_ms": {}, "tokens": {}}
+    token = _request.set(current)
+    try:
+        yield current
+    finally:
+        _request.reset(token)
+
+
+# ==============================
+# EXPOSITION
+# ==============================
+_stats_sources = {}    # name -> zero-argument callable returning a stats() dict
+
+
+def register_stats(name: str, stats):
+    """
+    Export a module's stats() dict under the label cache=`name`:
+    hit_rate as a gauge, *entries sizes as a gauge, and every other
+    number (hits, misses, evictions, ...) as a counter.
+    """
+    _stats_sources[name] = stats
+
+
+class CacheStatsCollector:
+    def collect(self):
+        hit_ratio = GaugeMetricFamily("rag_cache_hit_ratio", "Hit rate of each in-process cache", labels=["cache"])
+        entries = GaugeMetricFamily("rag_cache_entries", "Entries held by each in-process cache", labels=["cache"])
+        events = CounterMetricFamily("rag_cache_events", "Counters reported by each cache's stats()",
+                                     labels=["cache", "event"])
+
+        for name, stats in sorted(_stats_sources.items()):
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if key == "hit_rate":
+                    hit_ratio.add_metric([name], value)
+                elif key.endswith("entries"):
+                    entries.add_metric([name], value)
+                else:
+                    events.add_metric([name, key], value)
+
+        yield hit_ratio
+        yield entries
+        yield events
+
+
+REGISTRY.register(CacheStatsCollector())
+
+
+def render() -> bytes:
+    """
+    Every metric in the Prometheus text exposition format.
+    """
+    return generate_latest(REGISTRY)
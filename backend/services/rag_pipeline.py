@@ -1,15 +1,22 @@
 # backend/services/rag_pipeline.py
 import os
-from backend.services.azure_search import vector_search_text, vector_search_images
-from openai import OpenAI
+import asyncio
+from dataclasses import replace
+import time
+from backend.services import answer_cache, metrics, reranker
+from backend.services.context_packer import pack_evidence
+from backend.services.search_backend import (
+    RetrievalOptions,
+    search_text_and_images,
+    search_text_and_images_async
+)
+from backend.services.clients import get_openai_client, get_async_openai_client
+from backend.services.embeddings import embed_query, embed_query_async
 
 
-client = OpenAI()
-
 # ----------------------------
-# OpenAI client
+# OpenAI model
 # ----------------------------
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
 # ----------------------------
@@ -135,34 +142,28 @@ Instructions:
 Answer clearly and concisely.
 """
 
-def answer_question(question: str, top_k: int = 5):
-    text_results, image_results = retrieve_context(question)
-    
-    if not text_results and not image_results:
-        return {
-            "question": question,
-            "answer": "The information is not available in the provided documents.",
-            "sources": []
-        }
+def no_evidence_answer(question: str):
+    return {
+        "question": question,
+        "answer": "The information is not available in the provided documents.",
+        "sources": []
+    }
+
 
+def build_messages(question: str, text_results, image_results):
     assign_source_ids(text_results, image_results)
 
     context = build_context(text_results, image_results)
     prompt = build_prompt(question, context)
 
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1
-    )
-
-    answer = response.choices[0].message.content
-    used_ids = extract_used_source_ids(answer)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
 
 
+def finalize_answer(question: str, answer: str, text_results, image_results, context_tokens: int = None):
+    used_ids = extract_used_source_ids(answer)
 
     final_sources = [
         build_source_metadata(p)
@@ -173,27 +174,236 @@ def answer_question(question: str, top_k: int = 5):
     return {
         "question": question,
         "answer": answer,
-        "sources": final_sources
+        "sources": final_sources,
+        "context_tokens": context_tokens
     }
 
 
+def answer_question(question: str, top_k: int = None, options: RetrievalOptions = None):
+    options = resolve_options(top_k, options)
+    scope = options.scope()
+
+    cached = answer_cache.lookup_exact(question, scope)
+    if cached:
+        return cached
+
+    query_vector = embed_query(question)
+
+    cached = answer_cache.lookup_similar(query_vector, scope)
+    if cached:
+        return cached
+
+    text_results, image_results, complete = retrieve_context(question, query_vector, options)
+
+    if not text_results and not image_results:
+        return {**no_evidence_answer(question), "cache_hit": False}
+
+    with metrics.span("pack_context"):
+        text_results, image_results, context_tokens = pack_evidence(text_results, image_results)
+
+    # the token budget can drop every item
+    if not text_results and not image_results:
+        return {**no_evidence_answer(question), "cache_hit": False}
+
+    with metrics.span("chat_completion"):
+        response = get_openai_client().chat.completions.create(
+            model=MODEL,
+            messages=build_messages(question, text_results, image_results),
+            temperature=0.1
+        )
+    metrics.record_usage(MODEL, response.usage)
+
+    answer = response.choices[0].message.content
+    result = finalize_answer(question, answer, text_results, image_results, context_tokens)
+
+    # a partial retrieval must not be served to later askers for the TTL
+    if complete:
+        answer_cache.store(question, query_vector, result, scope)
+    return {**result, "cache_hit": False}
+
+
+async def answer_question_async(question: str, top_k: int = None, options: RetrievalOptions = None):
+    options = resolve_options(top_k, options)
+    scope = options.scope()
+
+    cached = answer_cache.lookup_exact(question, scope)
+    if cached:
+        return cached
+
+    query_vector = await embed_query_async(question)
 
+    cached = answer_cache.lookup_similar(query_vector, scope)
+    if cached:
+        return cached
 
-def embed_query(query: str) -> list:
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query
+    text_results, image_results, complete = await retrieve_context_async(question, query_vector, options)
+
+    if not text_results and not image_results:
+        return {**no_evidence_answer(question), "cache_hit": False}
+
+    with metrics.span("pack_context"):
+        text_results, image_results, context_tokens = pack_evidence(text_results, image_results)
+
+    # the token budget can drop every item
+    if not text_results and not image_results:
+        return {**no_evidence_answer(question), "cache_hit": False}
+
+    with metrics.span("chat_completion"):
+        response = await get_async_openai_client().chat.completions.create(
+            model=MODEL,
+            messages=build_messages(question, text_results, image_results),
+            temperature=0.1
+        )
+    metrics.record_usage(MODEL, response.usage)
+
+    answer = response.choices[0].message.content
+    result = finalize_answer(question, answer, text_results, image_results, context_tokens)
+
+    # a partial retrieval must not be served to later askers for the TTL
+    if complete:
+        answer_cache.store(question, query_vector, result, scope)
+    return {**result, "cache_hit": False}
+
+
+async def stream_answer_async(question: str, top_k: int = None, options: RetrievalOptions = None):
+    """
+    Streaming variant of answer_question_async. Yields events:
+
+        {"event": "sources", "data": [...]}   every retrieved source, once retrieval finishes
+        {"event": "token", "data": "..."}     answer text as it is generated
+        {"event": "done", "data": {...}}      final answer and the sources it cited
+
+    A cached answer is replayed as a single token.
+    """
+    options = resolve_options(top_k, options)
+    scope = options.scope()
+
+    cached = answer_cache.lookup_exact(question, scope)
+    query_vector = None
+
+    if not cached:
+        query_vector = await embed_query_async(question)
+        cached = answer_cache.lookup_similar(query_vector, scope)
+
+    if cached:
+        yield {"event": "sources", "data": cached["sources"]}
+        yield {"event": "token", "data": cached["answer"]}
+        yield {"event": "done", "data": cached}
+        return
+
+    text_results, image_results, complete = await retrieve_context_async(question, query_vector, options)
+
+    if not text_results and not image_results:
+        result = {**no_evidence_answer(question), "cache_hit": False}
+        yield {"event": "sources", "data": []}
+        yield {"event": "token", "data": result["answer"]}
+        yield {"event": "done", "data": result}
+        return
+
+    with metrics.span("pack_context"):
+        text_results, image_results, context_tokens = pack_evidence(text_results, image_results)
+
+    # the token budget can drop every item
+    if not text_results and not image_results:
+        result = {**no_evidence_answer(question), "cache_hit": False}
+        yield {"event": "sources", "data": []}
+        yield {"event": "token", "data": result["answer"]}
+        yield {"event": "done", "data": result}
+        return
+
+    messages = build_messages(question, text_results, image_results)
+    yield {
+        "event": "sources",
+        "data": [build_source_metadata(p) for p in (text_results + image_results)]
+    }
+
+    # chat_completion here includes time the client took to read tokens
+    parts = []
+    with metrics.span("chat_completion"):
+        started = time.perf_counter()
+        stream = await get_async_openai_client().chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=0.1,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+
+        async for chunk in stream:
+            if chunk.usage:
+                metrics.record_usage(MODEL, chunk.usage)
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if not parts:
+                    metrics.observe("chat_first_token", time.perf_counter() - started)
+                parts.append(token)
+                yield {"event": "token", "data": token}
+
+    answer = "".join(parts)
+    result = finalize_answer(question, answer, text_results, image_results, context_tokens)
+
+    # a partial retrieval must not be served to later askers for the TTL
+    if complete:
+        answer_cache.store(question, query_vector, result, scope)
+    yield {"event": "done", "data": {**result, "cache_hit": False}}
+
+
+def resolve_options(top_k: int = None, options: RetrievalOptions = None) -> RetrievalOptions:
+    # `top_k` is the text evidence count the API has always accepted
+    options = options or RetrievalOptions()
+    return replace(options, text_k=top_k) if top_k is not None else options
+
+
+def search_limits(options: RetrievalOptions):
+    text_k = options.fetch_k(options.text_k)
+    if reranker.is_enabled() and text_k:
+        # over-fetch text hits when a reranker will cut them back down
+        text_k = max(text_k, reranker.RERANK_CANDIDATES)
+    return text_k, options.fetch_k(options.image_k)
+
+
+def retrieve_context(user_question: str, query_vector=None, options: RetrievalOptions = None):
+    """
+    (text_results, image_results, complete). `complete` is False when a
+    search timed out, so the evidence may be missing hits.
+    """
+    options = options or RetrievalOptions()
+    if query_vector is None:
+        query_vector = embed_query(user_question)
+
+    # both searches run at the same time
+    text_results, image_results, complete = search_text_and_images(
+        query_vector, *search_limits(options),
+        query_text=user_question, asset_types=options.asset_types
     )
-    return response.data[0].embedding
 
+    with metrics.span("rerank"):
+        text_results = reranker.rerank(user_question, options.keep(text_results), options.text_k)
+    image_results = options.keep(image_results, options.image_k)
+
+    return text_results, image_results, complete
 
-def retrieve_context(user_question: str):
-    query_vector = embed_query(user_question)
-    text_results = vector_search_text(query_vector)
-    image_results = vector_search_images(query_vector)
 
+async def retrieve_context_async(user_question: str, query_vector=None, options: RetrievalOptions = None):
+    options = options or RetrievalOptions()
+    if query_vector is None:
+        query_vector = await embed_query_async(user_question)
+
+    text_results, image_results, complete = await search_text_and_images_async(
+        query_vector, *search_limits(options),
+        query_text=user_question, asset_types=options.asset_types
+    )
+
+    # scoring is CPU-bound; keep it off the event loop
+    with metrics.span("rerank"):
+        text_results = await asyncio.to_thread(
+            reranker.rerank, user_question, options.keep(text_results), options.text_k
+        )
+    image_results = options.keep(image_results, options.image_k)
 
-    return text_results, image_results
+    return text_results, image_results, complete
 
 def assign_source_ids(text_results, image_results):
     sources = []
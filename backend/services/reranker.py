@@ -0,0 +1,143 @@
+# backend/services/reranker.py
+# Optional rerank stage between retrieval and prompt building: over-fetch
+# text hits, score (query, chunk) pairs on CPU, keep the best few.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from backend.services.keyword_index import BM25Index, reciprocal_rank_fusion
+
+
+# ==============================
+# CONFIG
+# ==============================
+# "none", "lexical" (BM25 over the candidates, no extra dependency)
+# or "cross-encoder" (sentence-transformers model on CPU)
+RERANKER = os.getenv("RERANKER", "none")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+
+_lock = threading.Lock()
+_cache = OrderedDict()   # (query hash, chunk hash) -> score
+_model = None
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank")
+_counters = {"reranked": 0, "fallbacks": 0, "cache_hits": 0, "scored": 0}
+
+
+def is_enabled() -> bool:
+    return RERANKER != "none"
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+# ==============================
+# SCORERS
+# ==============================
+def _cross_encoder_scores(query, texts):
+    global _model
+
+    if _model is None:
+        # optional dependency, only needed for this reranker
+        from sentence_transformers import CrossEncoder
+        _model = CrossEncoder(RERANK_MODEL, device="cpu")
+
+    scores = _model.predict([(query, t) for t in texts], batch_size=RERANK_BATCH_SIZE)
+    return [float(s) for s in scores]
+
+
+def _lexical_scores(query, texts):
+    # BM25 over the candidate set itself, fused with the original order
+    index = BM25Index()
+    for i, text in enumerate(texts):
+        index.add(i, text)
+
+    rows, _ = index.search(query, len(texts))
+    fused = reciprocal_rank_fusion([range(len(texts)), rows])
+    return [fused.get(i, 0.0) for i in range(len(texts))]
+
+
+SCORERS = {
+    "lexical": _lexical_scores,
+    "cross-encoder": _cross_encoder_scores,
+}
+
+
+def _score(query, texts):
+    """
+    Scores for every text; only pairs missing from the cache are sent
+    to the scorer, in one batch.
+    """
+    # the lexical scorer depends on the whole candidate set, so it is not
+    # cached per pair
+    if RERANKER == "lexical":
+        return SCORERS[RERANKER](query, texts)
+
+    query_hash = _hash(query)
+    keys = [(query_hash, _hash(t)) for t in texts]
+
+    with _lock:
+        cached = {k: _cache[k] for k in keys if k in _cache}
+        _counters["cache_hits"] += len(cached)
+
+    missing = [i for i, k in enumerate(keys) if k not in cached]
+
+    if missing:
+        fresh = SCORERS[RERANKER](query, [texts[i] for i in missing])
+
+        with _lock:
+            _counters["scored"] += len(missing)
+            for i, score in zip(missing, fresh):
+                cached[keys[i]] = score
+                _cache[keys[i]] = score
+                _cache.move_to_end(keys[i])
+            while len(_cache) > RERANK_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return [cached[k] for k in keys]
+
+
+# ==============================
+# RERANK
+# ==============================
+def rerank(query: str, hits: list, top_n: int, budget_ms: float = RERANK_BUDGET_MS) -> list:
+    """
+    Reorder `hits` by reranker score and keep `top_n`. If scoring takes
+    longer than `budget_ms`, the original order is kept instead (the
+    scores still land in the cache for next time).
+    """
+    if not is_enabled() or len(hits) <= 1:
+        return hits[:top_n]
+
+    texts = [h.get("content") or h.get("caption") or "" for h in hits]
+    future = _pool.submit(_score, query, texts)
+
+    try:
+        scores = future.result(timeout=budget_ms / 1000)
+    except FuturesTimeoutError:
+        print(f"⚠️ Rerank exceeded {budget_ms:.0f} ms; keeping retrieval order")
+        with _lock:
+            _counters["fallbacks"] += 1
+        return hits[:top_n]
+
+    for hit, score in zip(hits, scores):
+        hit["rerank_score"] = score
+
+    with _lock:
+        _counters["reranked"] += 1
+
+    ranked = sorted(hits, key=lambda h: h["rerank_score"], reverse=True)
+    return ranked[:top_n]
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_counters, "cache_entries": len(_cache)}
@@ -0,0 +1,103 @@
+# backend/services/search_backend.py
+# Retrieval backend selection. Every backend module exposes the same
+# functions (see azure_search.py and local_index.py); callers import
+# them from here so SEARCH_BACKEND decides where vectors live.
+import math
+import os
+from dataclasses import dataclass
+from importlib import import_module
+
+
+# "azure" (Azure AI Search) or "local" (in-process NumPy index)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "azure")
+
+# "vector" or "hybrid" (keyword BM25 + vector, fused with RRF)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "vector")
+
+# per-request retrieval defaults
+RETRIEVAL_TEXT_K = int(os.getenv("RETRIEVAL_TEXT_K", "5"))
+RETRIEVAL_IMAGE_K = int(os.getenv("RETRIEVAL_IMAGE_K", "3"))
+RETRIEVAL_OVERFETCH = float(os.getenv("RETRIEVAL_OVERFETCH", "1.0"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0"))
+
+BACKENDS = {
+    "azure": "backend.services.azure_search",
+    "local": "backend.services.local_index",
+}
+
+
+def get_backend(name: str = None):
+    name = name or SEARCH_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SEARCH_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+    return import_module(BACKENDS[name])
+
+
+@dataclass(frozen=True)
+class RetrievalOptions:
+    """
+    How much evidence one request retrieves.
+
+    Each search fetches `k * overfetch` hits; hits scoring below
+    `min_score` are dropped and the rest are cut back to `k`. The score
+    scale depends on SEARCH_MODE: vector scores sit between 0.5 and 1,
+    hybrid (RRF) scores are around 0.01-0.03. `asset_types` limits which
+    assets are searched, e.g. ("table",); None means all of them.
+    """
+    text_k: int = RETRIEVAL_TEXT_K
+    image_k: int = RETRIEVAL_IMAGE_K
+    overfetch: float = RETRIEVAL_OVERFETCH
+    min_score: float = RETRIEVAL_MIN_SCORE
+    asset_types: tuple = None
+
+    def fetch_k(self, k: int) -> int:
+        return math.ceil(k * max(self.overfetch, 1.0)) if k > 0 else 0
+
+    def keep(self, hits: list, k: int = None) -> list:
+        hits = [h for h in hits if (h.get("score") or 0.0) >= self.min_score]
+        return hits if k is None else hits[:k]
+
+    def scope(self) -> str:
+        # answer cache key: different options may give different answers
+        types = ",".join(sorted(self.asset_types)) if self.asset_types else "all"
+        return f"t{self.text_k}|i{self.image_k}|o{self.overfetch:g}|s{self.min_score:g}|{types}"
+
+
+def upload_documents(documents, **kwargs):
+    return get_backend().upload_documents(documents, **kwargs)
+
+
+def delete_documents(keys):
+    return get_backend().delete_documents(keys)
+
+
+def _query_text(query_text):
+    # keyword side only runs in hybrid mode
+    return query_text if SEARCH_MODE == "hybrid" else None
+
+
+def vector_search_text(query_vector, top_k: int = 5, query_text: str = None, asset_types=None):
+    return get_backend().vector_search_text(
+        query_vector, top_k, query_text=_query_text(query_text), asset_types=asset_types
+    )
+
+
+def vector_search_images(query_vector, top_k: int = 3, query_text: str = None, asset_types=None):
+    return get_backend().vector_search_images(
+        query_vector, top_k, query_text=_query_text(query_text), asset_types=asset_types
+    )
+
+
+def search_text_and_images(query_vector, text_k: int = 5, image_k: int = 3, query_text: str = None,
+                           asset_types=None):
+    # (text_hits, image_hits, complete); complete is False if a search timed out
+    return get_backend().search_text_and_images(
+        query_vector, text_k, image_k, query_text=_query_text(query_text), asset_types=asset_types
+    )
+
+
+async def search_text_and_images_async(query_vector, text_k: int = 5, image_k: int = 3,
+                                       query_text: str = None, asset_types=None):
+    return await get_backend().search_text_and_images_async(
+        query_vector, text_k, image_k, query_text=_query_text(query_text), asset_types=asset_types
+    )
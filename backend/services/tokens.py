@@ -0,0 +1,40 @@
+# backend/services/tokens.py
+# Token counting shared by chunking (embedding model) and context
+# packing (chat model). tiktoken is optional.
+import os
+
+from backend.services.embeddings import estimate_tokens
+
+
+_encodings = {}
+
+
+def get_encoding(model: str = None):
+    """
+    tiktoken encoding for `model`, or None when tiktoken is missing.
+    """
+    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+    if model not in _encodings:
+        try:
+            import tiktoken
+        except ImportError:
+            _encodings[model] = None
+        else:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """
+    Token count with the model's tokenizer when tiktoken is installed,
+    otherwise the ~4 characters per token estimate.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text or "")
+    return len(encoding.encode(text or "", disallowed_special=()))
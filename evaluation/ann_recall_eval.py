@@ -0,0 +1,95 @@
+import sys
+import time
+
+import numpy as np
+
+from backend.services.local_index import (
+    LOCAL_INDEX_QUANTIZATION,
+    bytes_per_vector,
+    get_local_index,
+    recall_at_k,
+    TEXT_ASSET_TYPES,
+    IMAGE_ASSET_TYPES
+)
+
+
+def sample_queries(index, field, n=100, noise=0.05, seed=0):
+    """
+    Stored vectors with a little noise, so queries are realistic but
+    do not trivially match themselves.
+    """
+    rng = np.random.default_rng(seed)
+    state = index._fields[field]
+    rows = np.flatnonzero(state["alive"])
+    picked = rng.choice(rows, min(n, len(rows)), replace=False)
+
+    vectors = np.asarray(state["matrix"][np.sort(picked)])
+    return vectors + noise * rng.standard_normal(vectors.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+
+
+def evaluate_ann(field="content_vector", k=10, nprobes=(1, 4, 8, 16, 32, 64)):
+    index = get_local_index()
+    queries = sample_queries(index, field)
+    asset_types = IMAGE_ASSET_TYPES if field == "image_vector" else TEXT_ASSET_TYPES
+
+    if index._fields[field]["ivf"] is None:
+        print(f"{field} has no IVF lists yet; searches are exact.")
+        return
+
+    print(f"Recall@{k} vs brute force on {len(queries)} queries")
+    for nprobe in nprobes:
+        recall = recall_at_k(index, field, queries, k, nprobe=nprobe, asset_types=asset_types)
+
+        start = time.perf_counter()
+        for q in queries:
+            index.search(field, q, k, asset_types, nprobe=nprobe)
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        print(f"nprobe={nprobe:>3} | recall@{k} = {recall:.3f} | {ms:.2f} ms/query")
+
+    start = time.perf_counter()
+    for q in queries:
+        index.search(field, q, k, asset_types, exact=True)
+    ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"brute force | {ms:.2f} ms/query")
+
+
+def evaluate_quantization(field="content_vector", k=10, rescores=(0, 2, 4, 8)):
+    """
+    Recall@k of the quantized scan (LOCAL_INDEX_QUANTIZATION) against
+    float32 brute force, without rescoring (0) and with the top
+    k * rescore candidates rescored in full precision.
+    """
+    index = get_local_index()
+    state = index._fields[field]
+
+    if state["quantized"] is None:
+        print("LOCAL_INDEX_QUANTIZATION is off; nothing to compare.")
+        return
+
+    queries = sample_queries(index, field)
+    asset_types = IMAGE_ASSET_TYPES if field == "image_vector" else TEXT_ASSET_TYPES
+    dim = state["matrix"].shape[1]
+
+    print(
+        f"{LOCAL_INDEX_QUANTIZATION}: {bytes_per_vector(dim)} bytes/vector in RAM "
+        f"vs {bytes_per_vector(dim, 'none')} for float32 "
+        f"({len(state['rows'])} rows, {dim} dims)"
+    )
+
+    for rescore in rescores:
+        recall = recall_at_k(index, field, queries, k, asset_types=asset_types, rescore=rescore)
+
+        start = time.perf_counter()
+        for q in queries:
+            index.search(field, q, k, asset_types, rescore=rescore)
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        print(f"rescore={rescore:>2} | recall@{k} = {recall:.3f} | {ms:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["quantization"]:
+        evaluate_quantization(*sys.argv[2:3])
+    else:
+        evaluate_ann(*sys.argv[1:2])
@@ -0,0 +1,562 @@
+# evaluation/benchmark.py
+# Offline benchmarks of the real ingest and query paths against the fakes
+# in evaluation/fakes.py: ingest throughput, upload throughput, retrieval
+# latency and /ask latency under concurrent load, with memory peaks.
+# Results are JSON so runs can be compared across commits:
+#
+#   python -m evaluation.benchmark --output bench.json
+#   python -m evaluation.benchmark --compare bench.json   (exit 1 on regression)
+#   python -m evaluation.benchmark --error-rate 0.05 --latency-scale 2
+#
+# Backend modules read their config at import time, so they are imported
+# only after configure_environment() has pointed them at the fakes.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+import numpy as np
+
+from evaluation.fakes import (
+    Faults,
+    FakeAsyncSearchClient,
+    FakeBlobContainer,
+    FakeOpenAIServer,
+    FakeSearchClient,
+    FakeSearchIndex,
+)
+
+
+# ==============================
+# CONFIG
+# ==============================
+# (latency_ms, jitter_ms) per fake service, roughly what the real
+# services show from an Azure VM in the same region
+LATENCY_PROFILE = {
+    "embeddings": (60, 20),
+    "chat": (700, 200),
+    "search": (40, 15),
+    "blob": (25, 10),
+}
+
+SCENARIOS = ("ingest", "upload", "retrieve", "ask", "ask_stream")
+
+# lower is better for these, higher for the rest (throughput)
+LOWER_IS_BETTER = ("ms", "seconds", "mb", "errors", "failed")
+
+WORDS = (
+    "lifting operation supervisor crane load rigging sling inspection permit hazard control "
+    "emergency stop procedure ppe harness scaffold confined space gas test ventilation "
+    "isolation lockout tagout electrical maintenance checklist risk assessment incident "
+    "report first aid fire extinguisher evacuation assembly point housekeeping signage"
+).split()
+
+
+# ==============================
+# ENVIRONMENT
+# ==============================
+def configure_environment(workdir: str, openai_base_url: str):
+    """
+    Point every backend setting at the fakes and at throwaway files.
+    Caches are off so each run measures cold work.
+    """
+    os.environ.update({
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": openai_base_url,
+        "AZURE_SEARCH_ENDPOINT": "https://fake.search.windows.net",
+        "AZURE_SEARCH_KEY": "fake",
+        "AZURE_SEARCH_INDEX_NAME": "fake-index",
+        "AZURE_STORAGE_CONTAINER": "fake-container",
+        "BLOB_CONNECTION_STRING": (
+            "DefaultEndpointsProtocol=https;AccountName=fake;AccountKey=ZmFrZQ==;EndpointSuffix=core.windows.net"
+        ),
+        "SEARCH_BACKEND": "azure",
+        "INGEST_MANIFEST_PATH": os.path.join(workdir, "manifest.json"),
+        "INDEX_VERSION_PATH": os.path.join(workdir, "index_version"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite"),
+        "CAPTION_CACHE_PATH": os.path.join(workdir, "captions.sqlite"),
+    })
+
+    # overridable from the shell, e.g. to benchmark with a reranker on
+    for name, value in {
+        "ANSWER_CACHE_ENABLED": "false",
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "CAPTION_CACHE_ENABLED": "false",
+        "CAPTION_BACKOFF_SECONDS": "0.05",
+        "SEARCH_UPLOAD_BACKOFF_SECONDS": "0.05",
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+def make_faults(scale: float, error_rate: float, seed: int) -> dict:
+    return {
+        name: Faults(latency * scale, jitter * scale, error_rate, seed + i)
+        for i, (name, (latency, jitter)) in enumerate(LATENCY_PROFILE.items())
+    }
+
+
+# ==============================
+# CORPUS
+# ==============================
+def sentence(rng: random.Random, n_words: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def make_docx(rng: random.Random, n_sections: int = 6) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for s in range(n_sections):
+        doc.add_heading(f"{s + 1} {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}", level=1)
+        for _ in range(rng.randint(3, 8)):
+            doc.add_paragraph(" ".join(sentence(rng) for _ in range(rng.randint(1, 4))))
+
+    out = BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def make_xlsx(rng: random.Random, n_rows: int = 200) -> bytes:
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "Hazard": [rng.choice(WORDS) for _ in range(n_rows)],
+        "Control": [sentence(rng, 8) for _ in range(n_rows)],
+        "Risk": [rng.randint(1, 25) for _ in range(n_rows)],
+        "Owner": [rng.choice(["HSE", "Operations", "Maintenance"]) for _ in range(n_rows)],
+    })
+
+    out = BytesIO()
+    df.to_excel(out, sheet_name="Register", index=False)
+    return out.getvalue()
+
+
+def make_pdf(rng: random.Random, n_pages: int = 4, with_image: bool = True) -> bytes:
+    import fitz
+    from PIL import Image
+
+    doc = fitz.open()
+    for p in range(n_pages):
+        page = doc.new_page()
+        text = "\n".join(
+            [f"{p + 1}. {rng.choice(WORDS).upper()} PROCEDURE"] + [sentence(rng) for _ in range(25)]
+        )
+        page.insert_textbox(fitz.Rect(50, 50, 550, 600), text, fontsize=9)
+
+        if with_image and p == 0:
+            pixels = np.random.default_rng(rng.randint(0, 2 ** 31)).integers(0, 255, (160, 160, 3), dtype=np.uint8)
+            png = BytesIO()
+            Image.fromarray(pixels).save(png, "PNG")
+            page.insert_image(fitz.Rect(50, 620, 210, 780), stream=png.getvalue())
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_corpus(n_docs: int, seed: int = 0) -> dict:
+    """
+    name -> bytes; a deterministic mix of DOCX, XLSX and PDF files.
+    """
+    rng = random.Random(seed)
+    makers = (("docx", make_docx), ("pdf", make_pdf), ("xlsx", make_xlsx))
+    corpus = {}
+
+    for i in range(n_docs):
+        ext, make = makers[i % len(makers)]
+        corpus[f"sop_{i:04d}.{ext}"] = make(rng)
+
+    return corpus
+
+
+# ==============================
+# MEASUREMENT
+# ==============================
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS; only a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemorySampler:
+    """
+    Peak resident memory of this process while the block runs, sampled
+    every `interval` seconds. Worker processes are not included.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = rss_mb()
+
+        def sample():
+            while not self._stop.wait(self.interval):
+                self.peak_mb = max(self.peak_mb, rss_mb())
+
+        self._thread = threading.Thread(target=sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def result(self) -> dict:
+        return {"rss_start_mb": round(self.start_mb, 1), "rss_peak_mb": round(self.peak_mb, 1),
+                "rss_growth_mb": round(self.peak_mb - self.start_mb, 1)}
+
+
+def latency_summary(latencies_ms) -> dict:
+    if not latencies_ms:
+        return {}
+
+    values = np.asarray(latencies_ms)
+    return {
+        "count": int(len(values)),
+        "mean_ms": round(float(values.mean()), 2),
+        **{f"p{p}_ms": round(float(np.percentile(values, p)), 2) for p in (50, 90, 95, 99)},
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+# ==============================
+# SCENARIOS
+# ==============================
+class Bench:
+    """
+    Shared state of one benchmark run: the fakes and the index that
+    ingest fills for the query scenarios.
+    """
+
+    def __init__(self, args, faults, server):
+        self.args = args
+        self.faults = faults
+        self.server = server
+        self.index = FakeSearchIndex()
+
+        from backend.services import clients
+
+        self.clients = clients
+        self.search_client = FakeSearchClient(self.index, faults["search"])
+        clients._sync["search"] = self.search_client
+
+        with open(os.path.join(os.path.dirname(__file__), "questions.json"), "r") as f:
+            self.questions = [q["question"] for q in json.load(f)]
+
+    def ingest(self, mode: str) -> dict:
+        from backend.ingest import ingest_blob
+
+        container = FakeBlobContainer(self.faults["blob"])
+        for name, data in make_corpus(self.args.docs, self.args.seed).items():
+            container.put(name, data)
+
+        ingest_blob.container_client = container
+        if os.path.exists(os.environ["INGEST_MANIFEST_PATH"]):
+            os.remove(os.environ["INGEST_MANIFEST_PATH"])
+
+        with MemorySampler() as memory:
+            start = time.perf_counter()
+            report = ingest_blob.ingest_documents(mode=mode, full_refresh=True)
+            seconds = time.perf_counter() - start
+
+        return {
+            "mode": mode,
+            "blobs": self.args.docs,
+            "documents": report["uploaded"],
+            "seconds": round(seconds, 3),
+            "blobs_per_sec": round(self.args.docs / seconds, 2),
+            "docs_per_sec": round(report["uploaded"] / seconds, 2),
+            "failed_blobs": len(report["failed_blobs"]),
+            "failed_docs": len(report["failed_keys"]),
+            "memory": memory.result(),
+        }
+
+    def upload(self) -> dict:
+        from backend.services.azure_search import upload_documents
+        from evaluation.fakes import fake_embedding
+
+        rng = random.Random(self.args.seed)
+        docs = []
+        for i in range(self.args.upload_docs):
+            text = sentence(rng, 60)
+            docs.append({
+                "metadata_storage_path": f"bench-upload-{i}",
+                "asset_type": "text",
+                "content": text,
+                "metadata_storage_name": "bench_upload.docx",
+                "content_vector": fake_embedding(text),
+            })
+
+        with MemorySampler() as memory:
+            start = time.perf_counter()
+            report = upload_documents(docs)
+            seconds = time.perf_counter() - start
+
+        self.search_client.delete_documents([{"metadata_storage_path": d["metadata_storage_path"]} for d in docs])
+
+        return {
+            "documents": len(docs),
+            "seconds": round(seconds, 3),
+            "docs_per_sec": round(len(docs) / seconds, 2),
+            "failed": len(report["failed"]),
+            "memory": memory.result(),
+        }
+
+    def retrieve(self) -> dict:
+        from backend.services.rag_pipeline import retrieve_context
+
+        latencies, errors = [], 0
+        with MemorySampler() as memory:
+            for i in range(self.args.requests):
+                start = time.perf_counter()
+                try:
+                    retrieve_context(self.questions[i % len(self.questions)])
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception:
+                    errors += 1
+
+        return {**latency_summary(latencies), "errors": errors, "memory": memory.result()}
+
+    def start_api(self):
+        """
+        Serve backend.app with uvicorn on a local port, in its own thread
+        and event loop, so requests go over real HTTP and streamed
+        responses arrive as they are produced. The lifespan opens the
+        async clients (pointed at the fake OpenAI server); the Search
+        client is then swapped for the fake.
+        """
+        import uvicorn
+        from backend.app import app
+
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        thread = threading.Thread(target=server.run, name="bench-api", daemon=True)
+        thread.start()
+
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("API server failed to start")
+            time.sleep(0.01)
+
+        self.clients._async["search"] = FakeAsyncSearchClient(self.index, self.faults["search"])
+        port = server.servers[0].sockets[0].getsockname()[1]
+        return server, thread, f"http://127.0.0.1:{port}"
+
+    async def _ask_load(self, base_url: str, path: str, concurrency: int) -> dict:
+        import httpx
+
+        latencies, first_bytes, statuses = [], [], {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(client, i):
+            async with semaphore:
+                start = time.perf_counter()
+                first = None
+                try:
+                    async with client.stream("GET", path, params={"q": self.questions[i % len(self.questions)]}) as r:
+                        async for _ in r.aiter_bytes():
+                            if first is None:
+                                first = (time.perf_counter() - start) * 1000
+                        status = r.status_code
+                except Exception as e:
+                    status = type(e).__name__
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if first is not None and path.endswith("/stream"):
+                        first_bytes.append(first)
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(one(client, i) for i in range(self.args.requests)))
+            seconds = time.perf_counter() - start
+
+        result = {
+            "concurrency": concurrency,
+            **latency_summary(latencies),
+            "requests_per_sec": round(self.args.requests / seconds, 2),
+            "errors": self.args.requests - statuses.get(200, 0),
+            "status_codes": {str(k): v for k, v in statuses.items()},
+        }
+        if first_bytes:
+            result["first_byte"] = latency_summary(first_bytes)
+        return result
+
+    def ask(self, paths) -> dict:
+        server, thread, base_url = self.start_api()
+        results = {}
+
+        try:
+            for path in paths:
+                runs = results[path] = []
+                for concurrency in self.args.concurrency:
+                    with MemorySampler() as memory:
+                        result = asyncio.run(self._ask_load(base_url, path, concurrency))
+                    runs.append({**result, "memory": memory.result()})
+                    print(f"⏱️ {path} c={concurrency}: p50 {result.get('p50_ms')} ms, p99 {result.get('p99_ms')} ms")
+        finally:
+            server.should_exit = True
+            thread.join()
+
+        return results
+
+
+# ==============================
+# RUN
+# ==============================
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+def run(args) -> dict:
+    faults = make_faults(args.latency_scale, args.error_rate, args.seed)
+    server = FakeOpenAIServer(faults["embeddings"], faults["chat"]).start()
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+
+    try:
+        configure_environment(workdir, server.base_url)
+        bench = Bench(args, faults, server)
+        results = {}
+
+        # the query scenarios need an index, so ingest always runs once
+        modes = args.ingest_modes if "ingest" in args.scenarios else ["sequential"]
+        ingest_runs = [bench.ingest(mode) for mode in modes]
+        if "ingest" in args.scenarios:
+            results["ingest"] = ingest_runs
+
+        if "upload" in args.scenarios:
+            results["upload"] = bench.upload()
+        if "retrieve" in args.scenarios:
+            results["retrieve"] = bench.retrieve()
+        paths = {"ask": "/ask", "ask_stream": "/ask/stream"}
+        wanted = [name for name in paths if name in args.scenarios]
+        if wanted:
+            runs = bench.ask([paths[name] for name in wanted])
+            for name in wanted:
+                results[name] = runs[paths[name]]
+
+        return {
+            "meta": {
+                **git_revision(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+                "latency_profile_ms": LATENCY_PROFILE,
+            },
+            "results": results,
+            "fakes": {
+                "openai": server.stats(),
+                "search": bench.search_client.stats(),
+                "blob": faults["blob"].stats(),
+            },
+        }
+    finally:
+        server.stop()
+
+
+# ==============================
+# COMPARE
+# ==============================
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            yield from flatten(v, f"{prefix}.{k}" if prefix else k)
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            # runs are keyed by what distinguishes them, not list position
+            key = v.get("mode", v.get("concurrency", i)) if isinstance(v, dict) else i
+            yield from flatten(v, f"{prefix}[{key}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list:
+    """
+    Print every metric present in both runs with its relative change and
+    return the ones that got worse by more than `threshold`.
+    """
+    before = dict(flatten(baseline["results"]))
+    regressions = []
+
+    for name, value in flatten(current["results"]):
+        if name not in before or name.endswith(("count", "concurrency", "blobs", "documents")):
+            continue
+
+        old = before[name]
+        change = (value - old) / old if old else 0.0
+        lower_better = any(part in name.rsplit(".", 1)[-1] for part in LOWER_IS_BETTER)
+        worse = change > threshold if lower_better else change < -threshold
+
+        flag = " ⚠️" if worse else ""
+        print(f"{name:<55} {old:>10} -> {value:>10} ({change:+.1%}){flag}")
+        if worse:
+            regressions.append({"metric": name, "baseline": old, "current": value, "change": round(change, 4)})
+
+    return regressions
+
+
+# ==============================
+# ENTRY POINT
+# ==============================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline RAG benchmarks against local fakes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda s: [x for x in s.split(",") if x])
+    parser.add_argument("--docs", type=int, default=12, help="blobs in the synthetic corpus")
+    parser.add_argument("--ingest-modes", default="sequential,pipelined",
+                        type=lambda s: [x for x in s.split(",") if x])
+    parser.add_argument("--upload-docs", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=64, help="requests per retrieve/ask run")
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplies LATENCY_PROFILE; 0 = none")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of to stdout")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(json.load(f), report, args.threshold)
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"📊 Report written to {args.output}")
+    else:
+        print(text)
+
+    sys.exit(1 if report.get("regressions") else 0)
@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.ingest.reembed import SOURCE_TEXT, iter_source_batches, vector_field
+from backend.services.azure_search import to_image_hit, to_text_hit
+from backend.services.embeddings import EMBEDDING_MODEL, embed_texts, supports_dimensions, truncate_embeddings, vector_size
+from backend.services.local_index import LocalVectorIndex, IMAGE_ASSET_TYPES, TEXT_ASSET_TYPES
+from evaluation.retrieval_eval import precision_at_k
+
+
+DIMENSIONS = (256, 512, 1024, 1536)
+
+
+def full_size_corpus():
+    """
+    Every indexed document with a full-size vector: the stored one when
+    it is full size, a fresh embedding of its text otherwise.
+    """
+    full = vector_size(0)
+    docs = []
+
+    for batch in iter_source_batches():
+        missing = [d for d in batch if d.get(vector_field(d)) is None or len(d[vector_field(d)]) < full]
+        if missing:
+            texts = [d.get(SOURCE_TEXT[vector_field(d)]) or "" for d in missing]
+            for d, v in zip(missing, embed_texts(texts, dimensions=0)):
+                d[vector_field(d)] = v
+        docs.extend(batch)
+
+    return docs
+
+
+def index_bytes(path) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def run_queries(index, query_vectors, k):
+    results = []
+    start = time.perf_counter()
+
+    for q in query_vectors:
+        text = [to_text_hit(r) for r in index.search("content_vector", q, k, TEXT_ASSET_TYPES)]
+        images = [to_image_hit(r) for r in index.search("image_vector", q, k, IMAGE_ASSET_TYPES)]
+        results.append(text + images)
+
+    ms = (time.perf_counter() - start) / max(len(query_vectors), 1) * 1000
+    return results, ms
+
+
+def evaluate_dimensions(eval_data, k=5, dimensions=DIMENSIONS):
+    """
+    Precision@k, search latency and index size of a local index built at
+    each size in `dimensions`. Vectors are full-size embeddings truncated
+    to each size, which is what the API's `dimensions` parameter returns.
+    Also reports how much of the full-size top-k each size keeps.
+    """
+    if not supports_dimensions():
+        raise ValueError(f"{EMBEDDING_MODEL} vectors cannot be truncated; nothing to compare")
+
+    docs = full_size_corpus()
+    queries = embed_texts([item["question"] for item in eval_data], dimensions=0)
+    print(f"{len(docs)} documents, {len(eval_data)} questions\n")
+
+    baseline = None
+    report = []
+
+    for dims in sorted(dimensions, reverse=True):
+        with tempfile.TemporaryDirectory() as path:
+            index = LocalVectorIndex(path)
+            index.upsert([
+                {**d, vector_field(d): truncate_embeddings(d[vector_field(d)], dims)}
+                for d in docs
+            ])
+
+            results, ms = run_queries(index, truncate_embeddings(queries, dims), k)
+            size = index_bytes(path)
+
+        precision = np.mean([
+            precision_at_k(r, item["expected_sources"], k=k) for r, item in zip(results, eval_data)
+        ])
+
+        keys = [{(h["source_file"], h.get("content") or h.get("caption")) for h in r} for r in results]
+        if baseline is None:
+            baseline = keys
+        overlap = np.mean([len(a & b) / max(len(b), 1) for a, b in zip(keys, baseline)])
+
+        report.append({"dimensions": dims, "precision": float(precision), "overlap": float(overlap),
+                       "ms_per_query": ms, "index_mb": size / 2 ** 20})
+
+    print(f"{'dims':>5} | {'P@' + str(k):>6} | {'overlap':>7} | {'ms/query':>8} | {'index MB':>8}")
+    for row in sorted(report, key=lambda r: r["dimensions"]):
+        print(
+            f"{row['dimensions']:>5} | {row['precision']:>6.3f} | {row['overlap']:>7.3f} | "
+            f"{row['ms_per_query']:>8.2f} | {row['index_mb']:>8.2f}"
+        )
+
+    return report
+
+
+if __name__ == "__main__":
+    with open("evaluation/questions.json", "r") as f:
+        eval_data = json.load(f)
+
+    dims = tuple(int(d) for d in sys.argv[1:]) or DIMENSIONS
+    evaluate_dimensions(eval_data, dimensions=dims)
@@ -0,0 +1,500 @@
+# evaluation/fakes.py
+# Deterministic local stand-ins for OpenAI, Blob Storage and Azure AI
+# Search, so the benchmarks can run the real pipeline without accounts
+# or network. Each fake takes a Faults profile (latency, jitter, error
+# rate) and counts calls and injected errors.
+#
+# - FakeOpenAIServer is a real HTTP server speaking the OpenAI REST API,
+#   so the SDK clients (pools, retries, streaming) are exercised as-is.
+# - FakeBlobContainer / FakeSearchClient / FakeAsyncSearchClient mimic
+#   the SDK objects the services call.
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from aiohttp import web
+from azure.core.exceptions import HttpResponseError
+
+
+# ==============================
+# FAULTS
+# ==============================
+class Faults:
+    """
+    Latency (uniform in latency_ms +/- jitter_ms) and error injection
+    for one fake service, from a seeded generator.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def draw(self):
+        """
+        (delay_seconds, fail) for one call.
+        """
+        with self.lock:
+            self.calls += 1
+            low = max(0.0, self.latency_ms - self.jitter_ms)
+            delay = self.rng.uniform(low, self.latency_ms + self.jitter_ms) / 1000
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return delay, fail
+
+    def scaled(self, factor: float, error_rate: float = None, seed: int = 0) -> "Faults":
+        return Faults(
+            self.latency_ms * factor,
+            self.jitter_ms * factor,
+            self.error_rate if error_rate is None else error_rate,
+            seed
+        )
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"calls": self.calls, "errors": self.errors}
+
+
+def _injected_error(status_code: int, message: str = "injected fault") -> HttpResponseError:
+    error = HttpResponseError(message=message)
+    error.status_code = status_code
+    return error
+
+
+# ==============================
+# EMBEDDINGS
+# ==============================
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def fake_embedding(text: str, dimensions: int = 1536) -> np.ndarray:
+    """
+    Hashed bag of words: texts sharing words get similar vectors, so
+    retrieval over the fake index still ranks sensibly. Same text, same
+    vector, on every run.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        vector[h % dimensions] += 1.0 if (h >> 63) & 1 else -1.0
+
+    # a little text-specific noise keeps empty or one-word texts apart
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector += 0.05 * np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+    return vector / np.linalg.norm(vector)
+
+
+# ==============================
+# OPENAI
+# ==============================
+FAKE_ANSWER = (
+    "Follow the documented procedure and confirm the work area is safe before starting [T1]. "
+    "Wear the required PPE and report any defects to the supervisor [T2]."
+)
+FAKE_CAPTION = "Diagram of a safety procedure with labelled equipment and warning signs."
+
+
+class FakeOpenAIServer:
+    """
+    /v1/embeddings and /v1/chat/completions (plain and streamed) on
+    127.0.0.1, served from a background thread. Injected errors are 429s
+    with a short retry-after, as the real API sends when throttling.
+    """
+
+    def __init__(self, embed_faults: Faults = None, chat_faults: Faults = None,
+                 stream_chunk_ms: float = 0.0):
+        self.embed_faults = embed_faults or Faults()
+        self.chat_faults = chat_faults or Faults()
+        self.stream_chunk_ms = stream_chunk_ms
+        self.port = None
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+
+            app = web.Application(client_max_size=64 * 2 ** 20)
+            app.router.add_post("/v1/embeddings", self.embeddings)
+            app.router.add_post("/v1/chat/completions", self.chat)
+
+            self._runner = web.AppRunner(app, access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            self._loop.run_until_complete(site.start())
+            self.port = self._runner.addresses[0][1]
+
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-openai", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {"embeddings": self.embed_faults.stats(), "chat": self.chat_faults.stats(), "usage": dict(self.usage)}
+
+    @staticmethod
+    def _throttled():
+        return web.json_response(
+            {"error": {"message": "injected fault", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+            status=429,
+            headers={"retry-after-ms": "20"}
+        )
+
+    async def embeddings(self, request):
+        body = await request.json()
+        delay, fail = self.embed_faults.draw()
+        await asyncio.sleep(delay)
+        if fail:
+            return self._throttled()
+
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or 1536
+        as_base64 = body.get("encoding_format") == "base64"
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, dimensions)
+            embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        tokens = sum(len(t) // 4 + 1 for t in inputs)
+        self.usage["prompt_tokens"] += tokens
+
+        return web.json_response({
+            "object": "list",
+            "model": body.get("model"),
+            "data": data,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+    async def chat(self, request):
+        body = await request.json()
+        delay, fail = self.chat_faults.draw()
+        await asyncio.sleep(delay)
+        if fail:
+            return self._throttled()
+
+        messages = body.get("messages", [])
+        has_image = any(
+            isinstance(m.get("content"), list) and any(p.get("type") == "image_url" for p in m["content"])
+            for m in messages
+        )
+        answer = FAKE_CAPTION if has_image else FAKE_ANSWER
+
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(answer) // 4
+        self.usage["prompt_tokens"] += prompt_tokens
+        self.usage["completion_tokens"] += completion_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+        common = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model")}
+
+        if not body.get("stream"):
+            return web.json_response({
+                **common,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        def event(payload):
+            return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+        for word in re.findall(r"\S+\s*", answer):
+            await response.write(event({
+                **common,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+            }))
+            if self.stream_chunk_ms:
+                await asyncio.sleep(self.stream_chunk_ms / 1000)
+
+        await response.write(event({
+            **common,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await response.write(event({**common, "object": "chat.completion.chunk", "choices": [], "usage": usage}))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+# ==============================
+# BLOB STORAGE
+# ==============================
+class FakeBlob:
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.size = len(data)
+        self.etag = hashlib.md5(data).hexdigest()
+        self.last_modified = datetime.now(timezone.utc)
+
+
+class FakeDownload:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def readall(self) -> bytes:
+        return self._data
+
+
+class FakeBlobClient:
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+
+    def download_blob(self):
+        self.container.call()
+        return FakeDownload(self.container.blobs[self.name])
+
+    def upload_blob(self, data, overwrite=False):
+        self.container.call()
+        if not overwrite and self.name in self.container.blobs:
+            raise _injected_error(409, "blob already exists")
+        self.container.put(self.name, data)
+
+
+class FakeBlobContainer:
+    """
+    In-memory ContainerClient: list_blobs, and get_blob_client for
+    download_blob().readall() and upload_blob(). Like the Storage SDK's
+    default retry policy, an injected 503 is retried (up to `retries`
+    times, exponential backoff) before it reaches the caller.
+    """
+
+    def __init__(self, faults: Faults = None, retries: int = 3, backoff_seconds: float = 0.05):
+        self.faults = faults or Faults()
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.blobs = {}
+        self.properties = {}
+        self.lock = threading.Lock()
+
+    def call(self):
+        for attempt in range(self.retries + 1):
+            delay, fail = self.faults.draw()
+            time.sleep(delay)
+            if not fail:
+                return
+            if attempt < self.retries:
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+
+        raise _injected_error(503)
+
+    def put(self, name: str, data: bytes):
+        with self.lock:
+            self.blobs[name] = bytes(data)
+            self.properties[name] = FakeBlob(name, data)
+
+    def list_blobs(self):
+        self.call()
+        with self.lock:
+            return list(self.properties.values())
+
+    def get_blob_client(self, name: str) -> FakeBlobClient:
+        return FakeBlobClient(self, name)
+
+
+# ==============================
+# SEARCH
+# ==============================
+class UploadResult:
+    def __init__(self, key, succeeded, status_code, error_message=None):
+        self.key = key
+        self.succeeded = succeeded
+        self.status_code = status_code
+        self.error_message = error_message
+
+
+class FakeSearchIndex:
+    """
+    Documents kept in a dict, searched by brute-force cosine over each
+    vector field. Scores follow Azure's 1 / (1 + cosine distance).
+    Only `asset_type eq '...'` filters (what the services send) are
+    understood; keyword text is ignored, so hybrid queries rank by
+    vector alone.
+    """
+
+    KEY = "metadata_storage_path"
+    VECTOR_FIELDS = ("content_vector", "image_vector")
+
+    def __init__(self):
+        self.docs = {}
+        self.lock = threading.Lock()
+        self._matrices = {}
+
+    def upload(self, documents, faults: Faults):
+        results = []
+        with self.lock:
+            for doc in documents:
+                _, fail = faults.draw()
+                if fail:
+                    results.append(UploadResult(doc[self.KEY], False, 429, "injected fault"))
+                    continue
+                self.docs[doc[self.KEY]] = dict(doc)
+                results.append(UploadResult(doc[self.KEY], True, 201))
+            self._matrices.clear()
+        return results
+
+    def delete(self, documents):
+        with self.lock:
+            for doc in documents:
+                self.docs.pop(doc[self.KEY], None)
+            self._matrices.clear()
+
+    def _matrix(self, field):
+        # caller holds lock
+        if field not in self._matrices:
+            docs = [d for d in self.docs.values() if d.get(field) is not None]
+            matrix = np.array([d[field] for d in docs], dtype=np.float32).reshape(len(docs), -1)
+            if len(docs):
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            types = np.array([d.get("asset_type") or "" for d in docs], dtype=object)
+            self._matrices[field] = (docs, matrix, types)
+        return self._matrices[field]
+
+    def search(self, search_text=None, top=None, vector_queries=None, filter=None, select=None, **kwargs):
+        allowed = re.findall(r"asset_type eq '([^']*)'", filter or "")
+
+        def project(doc, score=None):
+            hit = {k: doc.get(k) for k in select} if select else {
+                k: v for k, v in doc.items() if k not in self.VECTOR_FIELDS
+            }
+            hit["@search.score"] = score if score is not None else 1.0
+            return hit
+
+        with self.lock:
+            if not vector_queries:
+                docs = [d for d in self.docs.values() if not allowed or d.get("asset_type") in allowed]
+                return [project(d) for d in docs[:top]]
+
+            query = vector_queries[0]
+            docs, matrix, types = self._matrix(query["fields"])
+            if not docs:
+                return []
+
+            vector = np.asarray(query["vector"], dtype=np.float32)
+            scores = matrix @ (vector / max(np.linalg.norm(vector), 1e-12))
+            if allowed:
+                scores = np.where(np.isin(types, allowed), scores, -np.inf)
+
+            k = min(top or query.get("k") or 50, query.get("k") or len(docs), len(docs))
+            best = np.argsort(-scores)[:k]
+            return [project(docs[i], 1.0 / (2.0 - float(scores[i]))) for i in best if np.isfinite(scores[i])]
+
+
+class FakeSearchClient:
+    """
+    Sync SearchClient over a FakeSearchIndex. Injected errors are 503s
+    on search and per-document 429s on upload, which is how the real
+    service reports throttling.
+    """
+
+    def __init__(self, index: FakeSearchIndex = None, faults: Faults = None):
+        self.index = index or FakeSearchIndex()
+        self.faults = faults or Faults()
+        self.upload_faults = Faults(error_rate=self.faults.error_rate, seed=1)
+
+    def _call(self):
+        delay, fail = self.faults.draw()
+        time.sleep(delay)
+        if fail:
+            raise _injected_error(503)
+
+    def upload_documents(self, documents):
+        delay, _ = self.faults.draw()
+        time.sleep(delay)
+        return self.index.upload(documents, self.upload_faults)
+
+    def delete_documents(self, documents):
+        self._call()
+        self.index.delete(documents)
+
+    def search(self, search_text=None, **kwargs):
+        self._call()
+        return iter(self.index.search(search_text, **kwargs))
+
+    def stats(self) -> dict:
+        return {"requests": self.faults.stats(), "upload_documents": self.upload_faults.stats()}
+
+
+class _AsyncResults:
+    def __init__(self, results):
+        self._results = iter(results)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAsyncSearchClient:
+    def __init__(self, index: FakeSearchIndex = None, faults: Faults = None):
+        self.index = index or FakeSearchIndex()
+        self.faults = faults or Faults()
+
+    async def search(self, search_text=None, **kwargs):
+        delay, fail = self.faults.draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise _injected_error(503)
+        return _AsyncResults(self.index.search(search_text, **kwargs))
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"requests": self.faults.stats()}
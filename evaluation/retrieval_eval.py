@@ -22,7 +22,7 @@ def evaluate_retrieval(eval_data, k=5):
     scores = []
 
     for item in eval_data:
-        text_results, image_results = retrieve_context(item["question"])
+        text_results, image_results, _ = retrieve_context(item["question"])
         retrieved = text_results + image_results
 
         score = precision_at_k(
@@ -1,5 +1,6 @@
 import streamlit as st
 import uuid
+import json
 import requests
 import os
 from dotenv import load_dotenv
@@ -20,8 +21,10 @@ BLOB_SAS_TOKEN = os.getenv("BLOB_SAS_TOKEN")
 
 
 RAG_API_URL = "https://c402-14-100-82-94.ngrok-free.app/ask"
+RAG_STREAM_URL = f"{RAG_API_URL}/stream"
 
 USE_RAG = True
+USE_STREAMING = True
 
 
 def get_answer(query: str):
@@ -49,6 +52,69 @@ def get_answer(query: str):
 
 
 
+def iter_sse(resp):
+    """
+    Parse a text/event-stream response into (event, data) pairs.
+    """
+    event, data = "message", []
+
+    for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def stream_answer(query: str, placeholder):
+    """
+    Render answer tokens into `placeholder` as they arrive.
+    Falls back to the blocking endpoint if streaming fails before any token.
+    """
+    answer = ""
+
+    try:
+        with requests.get(
+            RAG_STREAM_URL,
+            params={"q": query, "top_k": 5},
+            stream=True,
+            timeout=60
+        ) as resp:
+            resp.raise_for_status()
+            resp.encoding = "utf-8"
+
+            for event, data in iter_sse(resp):
+                if event == "sources":
+                    placeholder.markdown("⏳ **Writing answer...**")
+                elif event == "token":
+                    answer += data
+                    placeholder.markdown(answer + "▌")
+                elif event == "done":
+                    placeholder.markdown(data.get("answer", answer))
+                    return {
+                        "answer": data.get("answer", answer),
+                        "sources": data.get("sources", []),
+                        "images": []
+                    }
+                elif event == "error":
+                    raise RuntimeError(data.get("detail"))
+
+        raise RuntimeError("stream ended before the answer was complete")
+
+    except Exception as e:
+        if not answer:
+            return get_answer(query)
+
+        return {
+            "answer": f"{answer}\n\n⚠️ Backend error:\n\n{e}",
+            "sources": [],
+            "images": []
+        }
+
+
 def format_title(text, max_len=4):
     text = text.replace("\n", " ")
     return text[:max_len] + "…" if len(text) > max_len else text
@@ -244,17 +310,27 @@ if query:
     with st.chat_message("user"):
         st.markdown(query)
 
-    # ==============================
-    # Global loading indicator
-    # (NO chat_message here!)
-    # ==============================
-    placeholder = st.empty()
-
-    with st.spinner("Analyzing SOP documents..."):
+    if USE_STREAMING:
+        # ==============================
+        # Progressive answer
+        # (replaced by the history render after rerun)
+        # ==============================
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
             placeholder.markdown("⏳ **Thinking...**")
-            result = get_answer(query)
-
-    placeholder.empty()
+            result = stream_answer(query, placeholder)
+    else:
+        # ==============================
+        # Global loading indicator
+        # (NO chat_message here!)
+        # ==============================
+        placeholder = st.empty()
+
+        with st.spinner("Analyzing SOP documents..."):
+                placeholder.markdown("⏳ **Thinking...**")
+                result = get_answer(query)
+
+        placeholder.empty()
 
     # ==============================
     # Save assistant message